@@ -1,24 +1,84 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import Flask, render_template, request, redirect, url_for, session, flash, g, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
 import datetime
-
-from src.db import ensure_database, get_conn, create_web_tables
+import hmac
+import io
+
+from src.cache import TTLCache
+from src.credit import compute_score
+from src.db import connect_schema, get_pool
+from src.history import DEFAULT_PAGE_SIZE, HistoryError, fetch_page
+from src.importer import StatementError, import_statement, iter_statement
+from src.portfolio import portfolio_history, portfolio_totals, record_buy, record_sell, snapshot
+from src.quotes import QuoteError, iter_quotes, upsert_quotes
+from src.queries import (
+    fetch_accounts,
+    fetch_accounts_fan_out,
+    fetch_dashboard,
+    fetch_dashboard_fan_out,
+    save_credit_score,
+)
+from src.rollup import add_to_rollup
+from src.score_api import ScoreRequestError, score_records
 
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SECRET_KEY", "dev-secret-key")
 
+# Per-user page aggregates, keyed by (page, user_id). Routes that change what
+# a page shows invalidate its entry after committing.
+page_cache = TTLCache(
+    maxsize=int(os.environ.get("PAGE_CACHE_SIZE", "1024")),
+    ttl_s=float(os.environ.get("PAGE_CACHE_TTL", "60")),
+)
+
+# "single": each page's reads in one round-trip on one connection (default).
+# "fan_out": the same reads as separate statements run concurrently on
+# several pooled connections.
+PAGE_QUERIES = os.environ.get("PAGE_QUERIES", "single")
+
+SCORE_API_MAX_RECORDS = int(os.environ.get("SCORE_API_MAX_RECORDS", "50000"))
+
+
+def invalidate_pages(user_id, *pages):
+    page_cache.invalidate(*((page, user_id) for page in pages))
+
 
 def init_db():
-    db_name = ensure_database()
-    conn = get_conn(db_name)
-    create_web_tables(conn)
+    # Only runs DDL when the web schema is behind WEB_MIGRATIONS
+    conn = connect_schema("credit_engine", "web")
     conn.close()
 
 
-def get_db():
-    return get_conn("credit_engine")
+def get_db(multi_statements=False):
+    # Checks a connection out of the shared pool. conn.close() hands it back;
+    # anything a route forgets to close is returned at the end of the request.
+    # multi_statements=True is only for fetch_accounts' fixed multi-statement read.
+    conn = get_pool("credit_engine", multi_statements).acquire()
+    g.setdefault("db_conns", []).append(conn)
+    return conn
+
+
+@app.teardown_appcontext
+def release_db(exc):
+    for conn in g.pop("db_conns", []):
+        conn.close()
+
+
+def _bearer_matches(token):
+    auth = request.headers.get("Authorization", "")
+    supplied = auth[len("Bearer "):].strip() if auth.startswith("Bearer ") else ""
+    return hmac.compare_digest(supplied, token)
+
+
+@app.route("/internal/stats")
+def internal_stats():
+    # Disabled unless INTERNAL_STATS_TOKEN is set.
+    token = os.environ.get("INTERNAL_STATS_TOKEN")
+    if not token or not _bearer_matches(token):
+        return jsonify(error="forbidden"), 403
+    return jsonify(db_pool=get_pool("credit_engine").stats(), page_cache=page_cache.stats())
 
 
 @app.route("/")
@@ -56,7 +116,7 @@ def register():
             "INSERT INTO users (email, password_hash, age, monthly_income, employment_type) VALUES (%s, %s, %s, %s, %s)",
             (email, pwd_hash, age or None, monthly_income or None, employment_type or None),
         )
-        conn.commit()
+        refresh_credit_score(conn, cur.lastrowid)
         cur.close()
         conn.close()
         flash("Registered successfully. Please login.")
@@ -90,131 +150,62 @@ def logout():
     return redirect(url_for("login"))
 
 
-def _month_filter():
-    today = datetime.date.today()
-    return today.year, today.month
+def _current_month():
+    # Dashboard totals are read from monthly_rollup, keyed by first of month
+    return datetime.date.today().replace(day=1)
 
 
-def _compute_score(monthly_income, total_expenses, total_emi, age, employment_type):
-    try:
-        income = float(monthly_income or 0.0)
-    except Exception:
-        income = 0.0
-    try:
-        expenses = float(total_expenses or 0.0)
-    except Exception:
-        expenses = 0.0
-    try:
-        emi = float(total_emi or 0.0)
-    except Exception:
-        emi = 0.0
-
-    if income <= 0:
-        return 300, "high", 0.0, 0.0, 0.0, -expenses - emi
-
-    savings = income - expenses - emi
-    dti = (emi / income) if income > 0 else 0.0
-    savings_rate = (savings / income) if income > 0 else 0.0
-
-    score = 750
-    # DTI adjustments
-    if dti < 0.2:
-        score += 50
-    elif dti < 0.4:
-        score += 0
-    elif dti < 0.6:
-        score -= 50
-    else:
-        score -= 100
-
-    # Savings rate
-    if savings_rate > 0.2:
-        score += 25
-    elif savings_rate < 0.05:
-        score -= 25
-
-    # Age
-    age_val = int(age or 0)
-    if 25 <= age_val <= 60:
-        score += 10
-    else:
-        score -= 10
-
-    # Employment type (simple bump for typical stable types)
-    emp = (employment_type or "").lower()
-    if emp in {"working", "commercial associate", "manager", "office work"}:
-        score += 10
-
-    score = max(300, min(850, score))
-    if score >= 750:
-        band = "low"
-    elif score >= 650:
-        band = "medium"
-    else:
-        band = "high"
-
-    return score, band, dti, dti, savings_rate, savings
+def _store_score(conn, user_id, data, month_start):
+    result = compute_score(data.monthly_income, data.total_expenses, data.total_emi, data.age, data.employment_type)
+    score, band, dti, emi_burden, savings_rate, _ = result
+    save_credit_score(conn, user_id, score, band, dti, emi_burden, savings_rate, month_start)
+    return result
 
 
-@app.route("/dashboard", methods=["GET"]) 
-def dashboard():
-    if "user_id" not in session:
-        return redirect(url_for("login"))
-    user_id = session["user_id"]
-    conn = get_db()
+def refresh_credit_score(conn, user_id):
+    # Called by routes that change score inputs (profile, income, expenses,
+    # loans) in place of conn.commit(): the pending writes are committed
+    # together with the recomputed score, so the dashboard never has to write.
+    # Locking the user row serializes concurrent mutations of one user: the
+    # later one reads its inputs only after the earlier one committed. That
+    # holds as long as the caller has not run a plain SELECT earlier in the
+    # transaction, which would pin an older snapshot.
+    month_start = _current_month()
     cur = conn.cursor()
+    cur.execute("SELECT id FROM users WHERE id=%s FOR UPDATE", (user_id,))
+    cur.close()
+    data = fetch_dashboard(conn, user_id, month_start)
+    _store_score(conn, user_id, data, month_start)
 
-    cur.execute("SELECT age, monthly_income, employment_type FROM users WHERE id=%s", (user_id,))
-    urow = cur.fetchone()
-    if urow:
-        age = urow['age']
-        monthly_income = urow['monthly_income']
-        employment_type = urow['employment_type']
-    else:
-        age = None
-        monthly_income = 0.0
-        employment_type = ""
-
-    cur.execute(
-        "SELECT COALESCE(SUM(amount),0) as total FROM income WHERE user_id=%s AND MONTH(tx_date)=MONTH(CURDATE()) AND YEAR(tx_date)=YEAR(CURDATE())",
-        (user_id,),
-    )
-    total_income = float(cur.fetchone()['total'] or 0.0)
-
-    cur.execute(
-        "SELECT COALESCE(SUM(amount),0) as total FROM expenses WHERE user_id=%s AND MONTH(tx_date)=MONTH(CURDATE()) AND YEAR(tx_date)=YEAR(CURDATE())",
-        (user_id,),
-    )
-    total_expenses = float(cur.fetchone()['total'] or 0.0)
-
-    cur.execute("SELECT COALESCE(SUM(monthly_emi),0) as total FROM loans WHERE user_id=%s", (user_id,))
-    total_emi = float(cur.fetchone()['total'] or 0.0)
-
-    base_income = float(monthly_income or 0.0)
-    shown_income = max(base_income, total_income)
 
-    score, band, dti, emi_burden, savings_rate, savings = _compute_score(
-        base_income, total_expenses, total_emi, age, employment_type
-    )
+def _dashboard_context(user_id):
+    month_start = _current_month()
+    if PAGE_QUERIES == "fan_out":
+        data = fetch_dashboard_fan_out(user_id, month_start)
+    else:
+        conn = get_db()
+        data = fetch_dashboard(conn, user_id, month_start)
+        conn.close()
 
-    cur.execute(
-        "INSERT INTO credit_score (user_id, score, risk_band, dti, emi_burden, savings_rate) VALUES (%s, %s, %s, %s, %s, %s) "
-        "ON DUPLICATE KEY UPDATE score=VALUES(score), risk_band=VALUES(risk_band), dti=VALUES(dti), emi_burden=VALUES(emi_burden), savings_rate=VALUES(savings_rate)",
-        (user_id, int(score), band, dti, emi_burden, savings_rate),
-    )
-    conn.commit()
+    base_income = data.monthly_income
+    shown_income = max(base_income, data.total_income)
 
-    cur.close()
-    conn.close()
+    if data.score is None or data.score_month != month_start:
+        # No stored score yet, or it was computed from last month's totals
+        conn = get_db()
+        score, band, dti, emi_burden, savings_rate, savings = _store_score(conn, user_id, data, month_start)
+        conn.close()
+    else:
+        score, band, dti, savings_rate = data.score, data.band, data.dti, data.savings_rate
+        savings = max(base_income, 0.0) - data.total_expenses - data.total_emi
 
-    return render_template(
-        "dashboard.html",
-        age=age,
+    return dict(
+        age=data.age,
         monthly_income=base_income,
-        employment_type=employment_type,
+        employment_type=data.employment_type,
         total_income=shown_income,
-        total_expenses=total_expenses,
-        total_emi=total_emi,
+        total_expenses=data.total_expenses,
+        total_emi=data.total_emi,
         savings=savings,
         score=int(score),
         band=band,
@@ -223,6 +214,15 @@ def dashboard():
     )
 
 
+@app.route("/dashboard", methods=["GET"]) 
+def dashboard():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    user_id = session["user_id"]
+    context = page_cache.get_or_load(("dashboard", user_id), lambda: _dashboard_context(user_id))
+    return render_template("dashboard.html", **context)
+
+
 @app.route("/income", methods=["POST"]) 
 def add_income():
     if "user_id" not in session:
@@ -237,29 +237,48 @@ def add_income():
         "INSERT INTO income (user_id, amount, category, tx_date) VALUES (%s, %s, %s, %s)",
         (user_id, amount, category, tx_date),
     )
-    conn.commit()
+    add_to_rollup(cur, user_id, "income", category, tx_date, amount)
+    refresh_credit_score(conn, user_id)
     cur.close()
     conn.close()
+    invalidate_pages(user_id, "dashboard")
     return redirect(url_for("dashboard"))
 
 
-@app.route("/stocks", methods=["GET"])
-def view_stocks():
-    if "user_id" not in session:
-        return redirect(url_for("login"))
-    user_id = session["user_id"]
+def _stocks_context(user_id):
     conn = get_db()
     cur = conn.cursor()
 
-    cur.execute("SELECT * FROM stocks WHERE user_id=%s ORDER BY ticker", (user_id,))
+    # Shared market quotes take precedence over the price stored per holding
+    cur.execute(
+        """
+        SELECT s.id, s.user_id, s.ticker, s.quantity, s.avg_buy_price,
+               COALESCE(q.price, s.current_price) AS current_price, q.quoted_at
+        FROM stocks s LEFT JOIN market_quotes q ON q.ticker = s.ticker
+        WHERE s.user_id=%s AND s.quantity > 0 ORDER BY s.ticker
+        """,
+        (user_id,),
+    )
     stocks = cur.fetchall()
-
-    total_investment = sum(s['quantity'] * s['avg_buy_price'] for s in stocks)
-    current_value = sum(s['quantity'] * s['current_price'] for s in stocks)
+    totals = portfolio_totals(cur, user_id)
 
     cur.close()
     conn.close()
-    return render_template("stocks.html", stocks=stocks, total_investment=round(total_investment, 2), current_value=round(current_value, 2))
+    return dict(
+        stocks=stocks,
+        total_investment=round(totals["invested"], 2),
+        current_value=round(totals["market_value"], 2),
+        realized_pnl=totals["realized_pnl"],
+    )
+
+
+@app.route("/stocks", methods=["GET"])
+def view_stocks():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    user_id = session["user_id"]
+    context = page_cache.get_or_load(("stocks", user_id), lambda: _stocks_context(user_id))
+    return render_template("stocks.html", **context)
 
 
 @app.route("/stocks/buy", methods=["POST"])
@@ -268,40 +287,24 @@ def buy_stock():
         return redirect(url_for("login"))
     user_id = session["user_id"]
     ticker = request.form.get("ticker").upper().strip()
-    qty = float(request.form.get("quantity"))
-    price = float(request.form.get("price"))
+    qty = request.form.get("quantity")
+    price = request.form.get("price")
     tx_date = datetime.date.today()
 
     conn = get_db()
     cur = conn.cursor()
-
-    # Record Transaction
-    cur.execute(
-        "INSERT INTO stock_transactions (user_id, ticker, tx_type, quantity, price, tx_date) VALUES (%s, %s, %s, %s, %s, %s)",
-        (user_id, ticker, "BUY", qty, price, tx_date)
-    )
-
-    # Update Holdings
-    cur.execute("SELECT * FROM stocks WHERE user_id=%s AND ticker=%s", (user_id, ticker))
-    existing = cur.fetchone()
-
-    if existing:
-        new_qty = float(existing['quantity']) + qty
-        total_cost = (float(existing['quantity']) * float(existing['avg_buy_price'])) + (qty * price)
-        new_avg = total_cost / new_qty
-        cur.execute(
-            "UPDATE stocks SET quantity=%s, avg_buy_price=%s, current_price=%s WHERE id=%s",
-            (new_qty, new_avg, price, existing['id'])
-        )
-    else:
-        cur.execute(
-            "INSERT INTO stocks (user_id, ticker, quantity, avg_buy_price, current_price) VALUES (%s, %s, %s, %s, %s)",
-            (user_id, ticker, qty, price, price)
-        )
-
+    try:
+        record_buy(cur, user_id, ticker, qty, price, tx_date)
+    except ValueError as e:
+        cur.close()
+        conn.close()
+        flash(str(e))
+        return redirect(url_for("view_stocks"))
+    snapshot(cur, user_id)
     conn.commit()
     cur.close()
     conn.close()
+    invalidate_pages(user_id, "stocks")
     flash(f"Bought {qty} shares of {ticker} at ₹{price}")
     return redirect(url_for("view_stocks"))
 
@@ -312,39 +315,57 @@ def sell_stock():
         return redirect(url_for("login"))
     user_id = session["user_id"]
     ticker = request.form.get("ticker")
-    qty = float(request.form.get("quantity"))
-    price = float(request.form.get("price"))
+    qty = request.form.get("quantity")
+    price = request.form.get("price")
     tx_date = datetime.date.today()
 
     conn = get_db()
     cur = conn.cursor()
-
-    cur.execute("SELECT * FROM stocks WHERE user_id=%s AND ticker=%s", (user_id, ticker))
-    existing = cur.fetchone()
-
-    if not existing or float(existing['quantity']) < qty:
-        flash("Insufficient quantity to sell.")
-        return redirect(url_for("view_stocks"))
-
-    # Record Transaction
-    cur.execute(
-        "INSERT INTO stock_transactions (user_id, ticker, tx_type, quantity, price, tx_date) VALUES (%s, %s, %s, %s, %s, %s)",
-        (user_id, ticker, "SELL", qty, price, tx_date)
-    )
-
-    new_qty = float(existing['quantity']) - qty
-    if new_qty > 0:
-        cur.execute("UPDATE stocks SET quantity=%s, current_price=%s WHERE id=%s", (new_qty, price, existing['id']))
+    try:
+        sold = record_sell(cur, user_id, ticker, qty, price, tx_date)
+    except ValueError as e:
+        sold, message = False, str(e)
     else:
-        cur.execute("DELETE FROM stocks WHERE id=%s", (existing['id'],))
-
+        message = "Insufficient quantity to sell."
+    if not sold:
+        conn.rollback()
+        cur.close()
+        conn.close()
+        flash(message)
+        return redirect(url_for("view_stocks"))
+    snapshot(cur, user_id)
     conn.commit()
     cur.close()
     conn.close()
+    invalidate_pages(user_id, "stocks")
     flash(f"Sold {qty} shares of {ticker} at ₹{price}")
     return redirect(url_for("view_stocks"))
 
 
+@app.route("/stocks/history", methods=["GET"])
+def stock_history():
+    # Daily portfolio valuations, read from portfolio_snapshots
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    user_id = session["user_id"]
+    days = min(max(request.args.get("days", 90, type=int), 1), 3660)
+    since = datetime.date.today() - datetime.timedelta(days=days - 1)
+    conn = get_db()
+    cur = conn.cursor()
+    rows = portfolio_history(cur, user_id, since)
+    cur.close()
+    conn.close()
+    return jsonify(history=[
+        {
+            "date": row["snapshot_date"].isoformat(),
+            "invested": float(row["invested"]),
+            "market_value": float(row["market_value"]),
+            "realized_pnl": float(row["realized_pnl"]),
+        }
+        for row in rows
+    ])
+
+
 @app.route("/stocks/update", methods=["POST"])
 def update_stock_price():
     if "user_id" not in session:
@@ -356,15 +377,105 @@ def update_stock_price():
     if new_price:
         conn = get_db()
         cur = conn.cursor()
+        # A shared market quote wins over the holding's own price, so a manual
+        # price only applies to tickers the feed does not cover.
+        cur.execute("SELECT price FROM market_quotes WHERE ticker=%s", (ticker,))
+        quote = cur.fetchone()
+        if quote:
+            cur.close()
+            conn.close()
+            flash(f"{ticker} is priced by the market feed (₹{quote['price']}); manual prices only apply to unquoted tickers.")
+            return redirect(url_for("view_stocks"))
         cur.execute("UPDATE stocks SET current_price=%s WHERE user_id=%s AND ticker=%s", (new_price, user_id, ticker))
+        snapshot(cur, user_id)
         conn.commit()
         cur.close()
         conn.close()
+        invalidate_pages(user_id, "stocks")
         flash(f"Updated price for {ticker}")
 
     return redirect(url_for("view_stocks"))
 
 
+@app.route("/api/history/<ledger>", methods=["GET"])
+def api_history(ledger):
+    # ?cursor=&limit=&from=YYYY-MM-DD&to=YYYY-MM-DD&match= ; see src/history.py
+    if "user_id" not in session:
+        return jsonify(error="login required"), 401
+    user_id = session["user_id"]
+    try:
+        date_from = request.args.get("from")
+        date_to = request.args.get("to")
+        date_from = datetime.date.fromisoformat(date_from) if date_from else None
+        date_to = datetime.date.fromisoformat(date_to) if date_to else None
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify(error="from/to must be YYYY-MM-DD and limit an integer"), 400
+
+    conn = get_db()
+    try:
+        items, next_cursor = fetch_page(
+            conn, ledger, user_id,
+            cursor=request.args.get("cursor"),
+            limit=limit,
+            date_from=date_from,
+            date_to=date_to,
+            match=request.args.get("match") or None,
+        )
+    except HistoryError as e:
+        return jsonify(error=str(e)), 400
+    finally:
+        conn.close()
+    return jsonify(items=items, next_cursor=next_cursor)
+
+
+@app.route("/api/score", methods=["POST"])
+def api_score():
+    # Body: {"model": "risk" | "credit", "records": [{...}, ...]}. Scores are
+    # computed in memory with the vectorized scorers; MySQL is not used.
+    # Requires "Authorization: Bearer <SCORE_API_TOKEN>"; disabled unless set.
+    token = os.environ.get("SCORE_API_TOKEN")
+    if not token or not _bearer_matches(token):
+        return jsonify(error="forbidden"), 403
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify(error="expected a JSON object with model and records"), 400
+    records = body.get("records")
+    if isinstance(records, list) and len(records) > SCORE_API_MAX_RECORDS:
+        return jsonify(error=f"at most {SCORE_API_MAX_RECORDS} records per request"), 413
+    model = body.get("model", "risk")
+    try:
+        results = score_records(model, records)
+    except ScoreRequestError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(model=model, count=len(records), **results)
+
+
+@app.route("/internal/quotes", methods=["POST"])
+def load_quotes():
+    # Price feed: an uploaded "quotes" file (CSV or JSON) or a JSON request
+    # body mapping ticker to price. Disabled unless QUOTE_FEED_TOKEN is set.
+    token = os.environ.get("QUOTE_FEED_TOKEN")
+    if not token or not _bearer_matches(token):
+        return jsonify(error="forbidden"), 403
+
+    upload = request.files.get("quotes")
+    if upload and upload.filename:
+        stream, filename = upload.stream, upload.filename
+    else:
+        stream, filename = io.BytesIO(request.get_data()), "body.json"
+
+    conn = get_db()
+    try:
+        tickers = upsert_quotes(conn, iter_quotes(stream, filename))
+    except QuoteError as e:
+        return jsonify(error=str(e)), 400
+    finally:
+        conn.close()
+    page_cache.invalidate_where(lambda key: key[0] == "stocks")
+    return jsonify(updated=len(tickers))
+
+
 @app.route("/expense", methods=["POST"]) 
 def add_expense():
     if "user_id" not in session:
@@ -379,9 +490,40 @@ def add_expense():
         "INSERT INTO expenses (user_id, amount, category, tx_date) VALUES (%s, %s, %s, %s)",
         (user_id, amount, category, tx_date),
     )
-    conn.commit()
+    add_to_rollup(cur, user_id, "expense", category, tx_date, amount)
+    refresh_credit_score(conn, user_id)
     cur.close()
     conn.close()
+    invalidate_pages(user_id, "dashboard")
+    return redirect(url_for("dashboard"))
+
+
+@app.route("/import", methods=["POST"])
+def import_transactions():
+    if "user_id" not in session:
+        return redirect(url_for("login"))
+    user_id = session["user_id"]
+    statement = request.files.get("statement")
+    if not statement or not statement.filename:
+        flash("Choose a CSV or JSON statement to import.")
+        return redirect(url_for("dashboard"))
+
+    conn = get_db()
+    cur = conn.cursor()
+    try:
+        counts = import_statement(cur, user_id, iter_statement(statement.stream, statement.filename))
+    except StatementError as e:
+        conn.rollback()
+        cur.close()
+        conn.close()
+        flash(f"Import failed, nothing was saved. {e}")
+        return redirect(url_for("dashboard"))
+    # One score recomputation for the whole statement
+    refresh_credit_score(conn, user_id)
+    cur.close()
+    conn.close()
+    invalidate_pages(user_id, "dashboard")
+    flash(f"Imported {counts['income']} income and {counts['expense']} expense rows.")
     return redirect(url_for("dashboard"))
 
 
@@ -408,38 +550,30 @@ def add_loan():
         """,
         (user_id, principal, monthly_emi, interest_rate, start_date, bank_name, due_day),
     )
-    conn.commit()
+    refresh_credit_score(conn, user_id)
     cur.close()
     conn.close()
+    invalidate_pages(user_id, "dashboard", "accounts")
     return redirect(url_for("view_accounts"))
 
 
+def _accounts_data(user_id):
+    if PAGE_QUERIES == "fan_out":
+        return fetch_accounts_fan_out(user_id)
+    conn = get_db(multi_statements=True)
+    data = fetch_accounts(conn, user_id)
+    conn.close()
+    return data
+
+
 @app.route("/accounts", methods=["GET"])
 def view_accounts():
     if "user_id" not in session:
         return redirect(url_for("login"))
     user_id = session["user_id"]
-    conn = get_db()
-    cur = conn.cursor()
+    data = page_cache.get_or_load(("accounts", user_id), lambda: _accounts_data(user_id))
 
-    # Fetch Banks
-    cur.execute("SELECT * FROM bank_accounts WHERE user_id=%s ORDER BY bank_name", (user_id,))
-    banks = cur.fetchall()
-
-    # Fetch Credit Cards
-    cur.execute("SELECT * FROM credit_cards WHERE user_id=%s ORDER BY bank_name", (user_id,))
-    cards = cur.fetchall()
-
-    # Fetch Loans (Liabilities)
-    cur.execute("SELECT * FROM loans WHERE user_id=%s ORDER BY bank_name", (user_id,))
-    loans = cur.fetchall()
-
-    conn.close()
-    
-    total_liquidity = sum(float(b['balance']) for b in banks)
-    total_debt = sum(float(c['outstanding_amount']) for c in cards) + sum(float(l['principal'] or 0) for l in loans)
-
-    return render_template("accounts.html", banks=banks, cards=cards, loans=loans, total_liquidity=total_liquidity, total_debt=total_debt)
+    return render_template("accounts.html", banks=data.banks, cards=data.cards, loans=data.loans, total_liquidity=data.total_liquidity, total_debt=data.total_debt)
 
 
 @app.route("/accounts/add_bank", methods=["POST"])
@@ -459,7 +593,9 @@ def add_bank():
         (user_id, bank_name, account_number, account_type, balance)
     )
     conn.commit()
+    cur.close()
     conn.close()
+    invalidate_pages(user_id, "accounts")
     flash("Bank account added successfully.")
     return redirect(url_for("view_accounts"))
 
@@ -482,7 +618,9 @@ def add_card():
         (user_id, bank_name, card_name, card_number, total_limit, due_day)
     )
     conn.commit()
+    cur.close()
     conn.close()
+    invalidate_pages(user_id, "accounts")
     flash("Credit card added successfully.")
     return redirect(url_for("view_accounts"))
 
@@ -498,7 +636,9 @@ def update_card():
     cur = conn.cursor()
     cur.execute("UPDATE credit_cards SET outstanding_amount=%s WHERE id=%s", (outstanding, card_id))
     conn.commit()
+    cur.close()
     conn.close()
+    invalidate_pages(session["user_id"], "accounts")
     flash("Card updated.")
     return redirect(url_for("view_accounts"))
 
@@ -515,7 +655,9 @@ def update_loan():
     cur = conn.cursor()
     cur.execute("UPDATE loans SET penalty_amount=%s, overdue_days=%s WHERE id=%s", (penalty, overdue_days, loan_id))
     conn.commit()
+    cur.close()
     conn.close()
+    invalidate_pages(session["user_id"], "accounts")
     flash("Loan updated.")
     return redirect(url_for("view_accounts"))
 
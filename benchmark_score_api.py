@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+from app import app
+
+
+# Measures POST /api/score end to end in process (JSON parsing, scoring and
+# serialization; no network or MySQL) at several batch sizes.
+
+def _risk_record(rng):
+    return {
+        "amt_income_total": round(rng.uniform(30000, 600000), 2),
+        "cnt_children": rng.randint(0, 4),
+        "days_birth": -rng.randint(18 * 365, 70 * 365),
+        "days_employed": -rng.randint(0, 30 * 365),
+    }
+
+
+def _credit_record(rng):
+    return {
+        "monthly_income": round(rng.uniform(0, 200000), 2),
+        "total_expenses": round(rng.uniform(0, 100000), 2),
+        "total_emi": round(rng.uniform(0, 50000), 2),
+        "age": rng.randint(18, 75),
+        "employment_type": rng.choice(["Working", "Pensioner", "Student", "Commercial associate"]),
+    }
+
+
+def bench(client, model, batch_size, repeats, token):
+    rng = random.Random(batch_size)
+    make = _risk_record if model == "risk" else _credit_record
+    body = json.dumps({"model": model, "records": [make(rng) for _ in range(batch_size)]})
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        response = client.post(
+            "/api/score", data=body, content_type="application/json", headers={"Authorization": f"Bearer {token}"}
+        )
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.get_json()
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return {
+        "model": model,
+        "batch": batch_size,
+        "p50_ms": round(p50 * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "records_per_sec": round(batch_size / p50),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the /api/score endpoint.")
+    parser.add_argument("--model", choices=["risk", "credit"], default="risk")
+    parser.add_argument("--sizes", default="1,100,1000,10000,50000")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    # The endpoint is disabled without a token; the test client runs in-process
+    token = os.environ.setdefault("SCORE_API_TOKEN", "benchmark")
+    client = app.test_client()
+    print(f"{'batch':>8} {'p50 ms':>10} {'p95 ms':>10} {'records/s':>12}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        r = bench(client, args.model, size, args.repeats, token)
+        print(f"{r['batch']:>8} {r['p50_ms']:>10} {r['p95_ms']:>10} {r['records_per_sec']:>12,}")
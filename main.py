@@ -1,24 +1,52 @@
 import os
 from dotenv import load_dotenv
-from src.db import ensure_database, get_conn, create_tables
+from src.db import connect_schema
 from src.etl import load_csv_into_mysql
 from src.risk import score_all
 from src.finance import compute_all
+from src.parallel import resolve_workers
+from src.pipeline import run_fused
+from src.profiling import PipelineProfiler
 
 
-def run(csv_path=os.path.join("data", "raw", "application_record.csv")):
-    db_name = ensure_database()
-    conn = get_conn(db_name)
-    create_tables(conn)
-    conn.close()
+def run(csv_path=os.path.join("data", "raw", "application_record.csv"), fused=None, incremental=None, workers=None, write_mode=None, report_path=None):
+    if fused is None:
+        fused = os.environ.get("PIPELINE_MODE", "sequential") == "fused"
+    if incremental is None:
+        incremental = os.environ.get("PIPELINE_INCREMENTAL", "0") == "1"
+    workers = resolve_workers(workers)
+    write_mode = write_mode or os.environ.get("PIPELINE_WRITE_MODE", "upsert")
+    report_path = report_path or os.environ.get("PIPELINE_REPORT", "pipeline_report.json")
+    if fused and (incremental or workers > 1 or write_mode != "upsert"):
+        # The fused pass always upserts every CSV row in this process
+        raise ValueError(
+            "PIPELINE_MODE=fused cannot be combined with PIPELINE_INCREMENTAL, "
+            "PIPELINE_WORKERS > 1 or PIPELINE_WRITE_MODE=swap"
+        )
+    profiler = PipelineProfiler()
 
-    load_csv_into_mysql(csv_path)
-    score_all()
-    compute_all()
-    print("Pipeline complete: ETL, risk scoring, finance metrics.")
+    if fused:
+        with profiler.stage("fused") as stage:
+            stage.rows = run_fused(csv_path)
+        print("Pipeline complete: fused ETL, risk scoring, finance metrics.")
+    else:
+        with profiler.stage("setup"):
+            conn = connect_schema("credit_engine", "pipeline")
+            conn.close()
+
+        with profiler.stage("etl") as stage:
+            stage.rows = load_csv_into_mysql(csv_path)
+        with profiler.stage("risk") as stage:
+            stage.rows = score_all(incremental=incremental, workers=workers, write_mode=write_mode)
+        with profiler.stage("finance") as stage:
+            stage.rows = compute_all(incremental=incremental, workers=workers, write_mode=write_mode)
+        print("Pipeline complete: ETL, risk scoring, finance metrics.")
+
+    report = profiler.write_report(report_path)
+    print(f"Pipeline report written to {report_path}")
+    return report
 
 
 if __name__ == "__main__":
     load_dotenv()
     run()
-
@@ -0,0 +1,122 @@
+import collections
+import threading
+import time
+
+
+# Small in-process LRU cache with per-entry TTL, used by the web app for
+# per-user page aggregates. Routes that change a user's data call
+# invalidate() after committing; the TTL only bounds how long an entry can
+# outlive a change made elsewhere (another process, a batch job).
+#
+# invalidate() also bumps the key's generation, and get_or_load only stores a
+# loaded value if the generation it saw before load() is still current, so a
+# load that overlaps an invalidation cannot put the stale result back.
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize=1024, ttl_s=60.0):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # Generations are only kept for keys with loads in flight
+        self._generations = {}
+        self._loading = collections.Counter()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_loads = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key, value, generation=None):
+        # With generation (from get_or_load's bookkeeping), the value is
+        # dropped if key was invalidated since; returns whether it was stored.
+        with self._lock:
+            if generation is not None and self._generations.get(key, 0) != generation:
+                self.stale_loads += 1
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def get_or_load(self, key, load):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            with self._lock:
+                self._loading[key] += 1
+                generation = self._generations.get(key, 0)
+            try:
+                value = load()
+                self.set(key, value, generation)
+            finally:
+                with self._lock:
+                    self._loading[key] -= 1
+                    if not self._loading[key]:
+                        del self._loading[key]
+                        self._generations.pop(key, None)
+        return value
+
+    def _bump(self, key):
+        # Caller holds self._lock
+        if key in self._loading:
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._bump(key)
+                if self._entries.pop(key, _MISSING) is not _MISSING:
+                    self.invalidations += 1
+
+    def invalidate_where(self, match):
+        # Drops every entry whose key satisfies match(key).
+        with self._lock:
+            for key in [key for key in self._loading if match(key)]:
+                self._bump(key)
+            keys = [key for key in self._entries if match(key)]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for key in self._loading:
+                self._bump(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_loads": self.stale_loads,
+            }
@@ -0,0 +1,146 @@
+import argparse
+import datetime
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.db import iter_batches, pooled_conn
+from src.rules import get_rules
+
+
+# Credit score of a web user, from their profile, this month's expenses and
+# their loans' EMIs, per the "credit" rules in src/scoring_rules.json.
+# compute_score scores one user (the dashboard and the mutating routes);
+# score_users is its column-wise equivalent, used by rescore_users to refresh
+# every user's credit_score row in bulk.
+
+
+def compute_score(monthly_income, total_expenses, total_emi, age, employment_type):
+    credit_rules = get_rules("credit")
+    try:
+        income = float(monthly_income or 0.0)
+    except Exception:
+        income = 0.0
+    try:
+        expenses = float(total_expenses or 0.0)
+    except Exception:
+        expenses = 0.0
+    try:
+        emi = float(total_emi or 0.0)
+    except Exception:
+        emi = 0.0
+
+    if income <= 0:
+        return credit_rules.no_income_score, credit_rules.band(credit_rules.no_income_score), 0.0, 0.0, 0.0, -expenses - emi
+
+    savings = income - expenses - emi
+    dti = (emi / income) if income > 0 else 0.0
+    savings_rate = (savings / income) if income > 0 else 0.0
+
+    score = (
+        credit_rules.base
+        + credit_rules.points("dti", dti)
+        + credit_rules.points("savings_rate", savings_rate)
+        + credit_rules.points("age", int(age or 0))
+        + credit_rules.points("employment_type", employment_type)
+    )
+    score = credit_rules.clamp(score)
+    return score, credit_rules.band(score), dti, dti, savings_rate, savings
+
+
+def score_users(monthly_income, total_expenses, total_emi, age, employment_type):
+    # Column-wise equivalent of compute_score over lists of DB values (None
+    # allowed). Returns arrays (scores, bands, dti, emi_burden, savings_rate,
+    # savings) matching the scalar results element for element.
+    credit_rules = get_rules("credit")
+    income = np.array([float(v or 0.0) for v in monthly_income], dtype=np.float64)
+    expenses = np.array([float(v or 0.0) for v in total_expenses], dtype=np.float64)
+    emi = np.array([float(v or 0.0) for v in total_emi], dtype=np.float64)
+    ages = np.array([int(v or 0) for v in age], dtype=np.int64)
+
+    has_income = income > 0
+    divisor = np.where(has_income, income, 1.0)
+    savings = np.where(has_income, income - expenses - emi, -expenses - emi)
+    dti = np.where(has_income, emi / divisor, 0.0)
+    savings_rate = np.where(has_income, savings / divisor, 0.0)
+
+    scores = (
+        credit_rules.base
+        + credit_rules.points_array("dti", dti)
+        + credit_rules.points_array("savings_rate", savings_rate)
+        + credit_rules.points_array("age", ages)
+        + credit_rules.points_array("employment_type", employment_type)
+    )
+    scores = np.where(has_income, credit_rules.clamp_array(scores), credit_rules.no_income_score)
+    return scores, credit_rules.band_array(scores), dti, dti, savings_rate, savings
+
+
+# Every user's scoring inputs for one month in a single pass: the monthly sums
+# are grouped once per table and joined, not computed per user.
+_INPUTS_SQL = (
+    "SELECT u.id, u.monthly_income, COALESCE(e.total, 0), COALESCE(l.emi, 0), u.age, u.employment_type "
+    "FROM users u "
+    "LEFT JOIN (SELECT user_id, SUM(total) AS total FROM monthly_rollup "
+    "           WHERE month=%s AND kind='expense' GROUP BY user_id) e ON e.user_id = u.id "
+    "LEFT JOIN (SELECT user_id, SUM(monthly_emi) AS emi FROM loans GROUP BY user_id) l ON l.user_id = u.id"
+)
+
+# Only plain placeholders in VALUES, so executemany sends multi-row inserts
+_UPSERT_SQL = (
+    "INSERT INTO credit_score (user_id, score, risk_band, dti, emi_burden, savings_rate, inputs_month, computed_at) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE score=VALUES(score), risk_band=VALUES(risk_band), dti=VALUES(dti), emi_burden=VALUES(emi_burden), "
+    "savings_rate=VALUES(savings_rate), inputs_month=VALUES(inputs_month), computed_at=VALUES(computed_at)"
+)
+
+
+def _score_rows(rows, month_start, computed_at):
+    user_ids, monthly_income, expenses, emi, ages, employment = zip(*rows)
+    scores, bands, dti, emi_burden, savings_rate, _ = score_users(monthly_income, expenses, emi, ages, employment)
+    return [
+        (user_id, score, band, d, b, s, month_start, computed_at)
+        for user_id, score, band, d, b, s in zip(
+            user_ids, scores.tolist(), bands.tolist(), dti.tolist(), emi_burden.tolist(), savings_rate.tolist()
+        )
+    ]
+
+
+def rescore_users(month_start=None, batch_size=5000):
+    # Recomputes every user's credit_score from month_start's totals (default:
+    # the current month), committing once per batch.
+    if month_start is None:
+        month_start = datetime.date.today().replace(day=1)
+    computed_at = datetime.datetime.now().replace(microsecond=0)
+    read_conn = pooled_conn()
+    conn = pooled_conn()
+    cur = conn.cursor()
+    total_rows = 0
+    started = time.perf_counter()
+
+    try:
+        for rows in iter_batches(read_conn, _INPUTS_SQL, (month_start,), batch_size=batch_size):
+            cur.executemany(_UPSERT_SQL, _score_rows(rows, month_start, computed_at))
+            conn.commit()
+            total_rows += len(rows)
+            print(f"Credit: Scored {total_rows} users...")
+    finally:
+        cur.close()
+        conn.close()
+        read_conn.close()
+
+    elapsed = time.perf_counter() - started
+    rate = total_rows / elapsed if elapsed > 0 else 0.0
+    print(f"Credit: {total_rows} users in {elapsed:.2f}s ({rate:,.0f} users/sec)")
+    return total_rows
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Recompute every web user's credit score.")
+    parser.add_argument("--month", default=None, help="YYYY-MM whose totals to use (default: current month)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    month = datetime.datetime.strptime(args.month, "%Y-%m").date() if args.month else None
+    rescore_users(month, args.batch_size)
@@ -1,8 +1,37 @@
+import collections
+import concurrent.futures
+import hashlib
 import os
+import queue
+import threading
+import time
 import pymysql
+from pymysql.constants import CLIENT, SERVER_STATUS
 
+from src import profiling
 
-def get_conn(db_name=None):
+
+# Connection and cursor classes that report every blocking call to the
+# pipeline profiler. Without an active profiling stage they behave exactly like
+# the PyMySQL classes they extend.
+class _ProfiledConnection(pymysql.connections.Connection):
+    def commit(self):
+        with profiling.db_call():
+            return super().commit()
+
+    def rollback(self):
+        with profiling.db_call():
+            return super().rollback()
+
+
+class _ProfiledDictCursor(pymysql.cursors.DictCursor):
+    # executemany issues its statements through execute, so each one counts.
+    def execute(self, query, args=None):
+        with profiling.db_call():
+            return super().execute(query, args)
+
+
+def get_conn(db_name=None, local_infile=False, multi_statements=False):
     host = os.environ.get("DB_HOST", "127.0.0.1")
     user = os.environ.get("DB_USER", "root")
     password = os.environ.get("DB_PASSWORD", "ayush@1A")
@@ -10,11 +39,302 @@ def get_conn(db_name=None):
         "host": host,
         "user": user,
         "password": password,
-        "cursorclass": pymysql.cursors.DictCursor
+        "cursorclass": _ProfiledDictCursor
     }
     if db_name:
         kwargs["database"] = db_name
-    return pymysql.connect(**kwargs)
+    if local_infile:
+        kwargs["local_infile"] = True
+    if multi_statements:
+        kwargs["client_flag"] = CLIENT.MULTI_STATEMENTS
+    with profiling.db_call():
+        return _ProfiledConnection(**kwargs)
+
+
+class PoolTimeoutError(pymysql.err.OperationalError):
+    # Raised with a message only: no MySQL error code applies, and borrowing one
+    # (e.g. CR_SERVER_LOST) would make it look like a dropped connection.
+    pass
+
+
+class PooledConnection:
+    # Proxy handed out by ConnectionPool. close() returns the connection to the
+    # pool instead of closing it; everything else is delegated.
+    def __init__(self, pool, conn, created_at):
+        self._pool = pool
+        self._conn = conn
+        self._created_at = created_at
+        self.released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if not self.released:
+            self.released = True
+            self._pool.release(self._conn, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    # Thread-safe pool of connections to one database. Idle connections are
+    # pinged on checkout once they have been idle for health_check_s, and
+    # replaced once they are older than recycle_s. acquire() blocks for up to
+    # timeout_s when max_size connections are checked out. Only a pool built
+    # with multi_statements=True accepts several statements per query; keep
+    # that one for fixed, fully parameterized reads (see get_pool).
+    def __init__(self, db_name=None, min_size=1, max_size=10, recycle_s=3600, health_check_s=30, timeout_s=30,
+                 multi_statements=False):
+        self.db_name = db_name
+        self.multi_statements = multi_statements
+        self.min_size = min_size
+        self.max_size = max_size
+        self.recycle_s = recycle_s
+        self.health_check_s = health_check_s
+        self.timeout_s = timeout_s
+        self._idle = collections.deque()  # (conn, created_at, last_used_at)
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_s_total": 0.0,
+            "wait_s_max": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "failed_health_checks": 0,
+        }
+        for _ in range(min_size):
+            with self._cond:
+                self._size += 1
+            self._idle.append(self._new_conn() + (time.monotonic(),))
+
+    def _new_conn(self):
+        try:
+            conn = get_conn(self.db_name, multi_statements=self.multi_statements)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        created_at = time.monotonic()
+        with self._cond:
+            self._stats["created"] += 1
+        return conn, created_at
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            while not self._idle and self._size >= self.max_size:
+                remaining = self.timeout_s - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(f"No free connection in pool after {self.timeout_s}s")
+                waited = True
+                self._cond.wait(remaining)
+
+            waited_s = time.monotonic() - started
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_s_total"] += waited_s
+                self._stats["wait_s_max"] = max(self._stats["wait_s_max"], waited_s)
+
+            if self._idle:
+                conn, created_at, last_used_at = self._idle.pop()
+            else:
+                self._size += 1
+                conn = None
+
+        if conn is None:
+            conn, created_at = self._new_conn()
+        else:
+            conn, created_at = self._check(conn, created_at, last_used_at)
+        return PooledConnection(self, conn, created_at)
+
+    def _check(self, conn, created_at, last_used_at):
+        now = time.monotonic()
+        if now - created_at > self.recycle_s:
+            self._discard(conn)
+            with self._cond:
+                self._stats["recycled"] += 1
+            return self._new_conn()
+        if now - last_used_at > self.health_check_s:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                self._discard(conn)
+                with self._cond:
+                    self._stats["failed_health_checks"] += 1
+                return self._new_conn()
+        return conn, created_at
+
+    def release(self, conn, created_at):
+        # Ends any open transaction so the next user starts with a fresh
+        # snapshot; broken connections are dropped.
+        healthy = conn.open
+        if healthy and conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            try:
+                conn.rollback()
+            except Exception:
+                healthy = False
+        with self._cond:
+            if healthy:
+                self._idle.append((conn, created_at, time.monotonic()))
+            else:
+                self._size -= 1
+            self._cond.notify()
+        if not healthy:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(size=self._size, idle=len(self._idle), in_use=self._size - len(self._idle), max_size=self.max_size)
+        stats["wait_s_total"] = round(stats["wait_s_total"], 4)
+        stats["wait_s_max"] = round(stats["wait_s_max"], 4)
+        return stats
+
+    def close(self):
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name="credit_engine", multi_statements=False):
+    # One pool per database and process; a forked worker builds its own.
+    # multi_statements=True gives a separate pool whose connections accept
+    # stacked statements, so the general pool never does.
+    key = (db_name, os.getpid(), multi_statements)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                db_name,
+                min_size=int(os.environ.get("DB_POOL_MIN", 1)),
+                max_size=int(os.environ.get("DB_POOL_MAX", 10)),
+                recycle_s=float(os.environ.get("DB_POOL_RECYCLE", 3600)),
+                health_check_s=float(os.environ.get("DB_POOL_HEALTH_CHECK", 30)),
+                timeout_s=float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+                multi_statements=multi_statements,
+            )
+            _pools[key] = pool
+    return pool
+
+
+def pooled_conn(db_name="credit_engine"):
+    return get_pool(db_name).acquire()
+
+
+_fan_out_executors = {}
+
+
+def _fan_out_executor():
+    # Shared by all requests of a process; threads stay alive between calls.
+    key = os.getpid()
+    with _pools_lock:
+        executor = _fan_out_executors.get(key)
+        if executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=int(os.environ.get("DB_FAN_OUT_THREADS", 8)),
+                thread_name_prefix="db-fan-out",
+            )
+            _fan_out_executors[key] = executor
+    return executor
+
+
+def _fetch_all(pool, sql, args):
+    conn = pool.acquire()
+    try:
+        cur = conn.cursor()
+        cur.execute(sql, args)
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+    finally:
+        conn.close()
+
+
+def fan_out(statements, db_name="credit_engine"):
+    # Runs independent (sql, args) reads concurrently, each on its own pooled
+    # connection, and returns their fetchall() results in order. Latency is
+    # that of the slowest statement, at the cost of one connection each.
+    pool = get_pool(db_name)
+    executor = _fan_out_executor()
+    futures = [executor.submit(_fetch_all, pool, sql, args) for sql, args in statements]
+    return [f.result() for f in futures]
+
+
+def iter_batches(conn, sql, args=None, batch_size=5000, prefetch=2):
+    # Streams the result of sql through an unbuffered server-side cursor and
+    # yields lists of plain tuples of at most batch_size rows. A reader thread
+    # keeps up to prefetch batches ready, so the caller can process one batch
+    # while the next is still coming off the wire. conn must not be used for
+    # anything else until the generator is exhausted or closed.
+    batches = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    done = object()
+
+    def _put(item):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _reader():
+        cur = conn.cursor(pymysql.cursors.SSCursor)
+        try:
+            cur.execute(sql, args)
+            while not stop.is_set():
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                _put(list(rows))
+            _put(done)
+        except Exception as e:
+            _put(e)
+        finally:
+            cur.close()
+
+    reader = threading.Thread(target=_reader, daemon=True)
+    reader.start()
+    round_trips = 1
+    try:
+        while True:
+            # Time the caller spends blocked here is time spent waiting on MySQL.
+            with profiling.db_call(round_trips):
+                item = batches.get()
+            round_trips = 0
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        reader.join()
 
 
 def ensure_database(db_name="credit_engine"):
@@ -26,9 +346,55 @@ def ensure_database(db_name="credit_engine"):
     return db_name
 
 
-def create_tables(conn):
+WRITE_MODES = ("upsert", "swap")
+
+
+def create_shadow_table(conn, table):
+    # Empty copy of table that a full recompute fills before swap_shadow_table
+    # makes it visible. A shadow left behind by a failed run is discarded.
+    shadow = f"{table}_shadow"
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {shadow}")
+    cur.execute(f"CREATE TABLE {shadow} LIKE {table}")
+    cur.close()
+    return shadow
+
+
+def swap_shadow_table(conn, table):
+    # RENAME TABLE swaps both names in one atomic step, so readers see either
+    # the old rows or the complete new set.
     cur = conn.cursor()
-    cur.execute(
+    cur.execute(f"DROP TABLE IF EXISTS {table}_old")
+    cur.execute(f"RENAME TABLE {table} TO {table}_old, {table}_shadow TO {table}")
+    cur.execute(f"DROP TABLE {table}_old")
+    cur.close()
+
+
+# Fingerprint of every applications column that risk or finance scoring reads.
+# score_inputs_hash() below must produce the same digest from Python values.
+SCORE_INPUTS_HASH_SQL = (
+    "MD5(CONCAT_WS('|', COALESCE(amt_income_total, ''), COALESCE(cnt_children, ''), "
+    "COALESCE(days_birth, ''), COALESCE(days_employed, '')))"
+)
+
+
+def score_inputs_hash(amt_income_total, cnt_children, days_birth, days_employed):
+    parts = (
+        "" if amt_income_total is None else f"{amt_income_total:.2f}",
+        "" if cnt_children is None else str(int(cnt_children)),
+        "" if days_birth is None else str(int(days_birth)),
+        "" if days_employed is None else str(int(days_employed)),
+    )
+    return hashlib.md5("|".join(parts).encode()).hexdigest()
+
+
+# Schema changes, in order, per component. Each entry is (version, statements).
+# A database at version N has run every statement of versions 1..N; append new
+# versions instead of editing old ones. Statements that only add a column or an
+# index may find it already present on databases created before versioning
+# existed, which is tolerated.
+PIPELINE_MIGRATIONS = [
+    (1, [
         """
         CREATE TABLE IF NOT EXISTS applications (
             id BIGINT PRIMARY KEY,
@@ -50,20 +416,14 @@ def create_tables(conn):
             occupation_type VARCHAR(64),
             cnt_fam_members DECIMAL(6,2)
         )
-        """
-    )
-
-    cur.execute(
+        """,
         """
         CREATE TABLE IF NOT EXISTS risk_scores (
             id BIGINT PRIMARY KEY,
             risk_score INT,
             risk_band VARCHAR(16)
         )
-        """
-    )
-
-    cur.execute(
+        """,
         """
         CREATE TABLE IF NOT EXISTS finance_metrics (
             id BIGINT PRIMARY KEY,
@@ -74,15 +434,18 @@ def create_tables(conn):
             age INT,
             dependents INT
         )
-        """
-    )
-
-    cur.close()
-    conn.commit()
+        """,
+    ]),
+    # Incremental rescoring fingerprints
+    (2, [
+        f"ALTER TABLE applications ADD COLUMN score_inputs_hash CHAR(32) AS ({SCORE_INPUTS_HASH_SQL}) STORED",
+        "ALTER TABLE risk_scores ADD COLUMN inputs_hash CHAR(32)",
+        "ALTER TABLE finance_metrics ADD COLUMN inputs_hash CHAR(32)",
+    ]),
+]
 
-def create_web_tables(conn):
-    cur = conn.cursor()
-    cur.execute(
+WEB_MIGRATIONS = [
+    (1, [
         """
         CREATE TABLE IF NOT EXISTS users (
             id BIGINT AUTO_INCREMENT PRIMARY KEY,
@@ -92,10 +455,7 @@ def create_web_tables(conn):
             monthly_income DECIMAL(15,2),
             employment_type VARCHAR(64)
         )
-        """
-    )
-
-    cur.execute(
+        """,
         """
         CREATE TABLE IF NOT EXISTS income (
             id BIGINT AUTO_INCREMENT PRIMARY KEY,
@@ -105,10 +465,7 @@ def create_web_tables(conn):
             tx_date DATE,
             INDEX (user_id)
         )
-        """
-    )
-
-    cur.execute(
+        """,
         """
         CREATE TABLE IF NOT EXISTS expenses (
             id BIGINT AUTO_INCREMENT PRIMARY KEY,
@@ -118,10 +475,7 @@ def create_web_tables(conn):
             tx_date DATE,
             INDEX (user_id)
         )
-        """
-    )
-
-    cur.execute(
+        """,
         """
         CREATE TABLE IF NOT EXISTS loans (
             id BIGINT AUTO_INCREMENT PRIMARY KEY,
@@ -132,10 +486,7 @@ def create_web_tables(conn):
             start_date DATE,
             INDEX (user_id)
         )
-        """
-    )
-
-    cur.execute(
+        """,
         """
         CREATE TABLE IF NOT EXISTS credit_score (
             user_id BIGINT PRIMARY KEY,
@@ -146,10 +497,7 @@ def create_web_tables(conn):
             savings_rate DECIMAL(10,4),
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
         )
-        """
-    )
-
-    cur.execute(
+        """,
         """
         CREATE TABLE IF NOT EXISTS stocks (
             id BIGINT AUTO_INCREMENT PRIMARY KEY,
@@ -160,10 +508,7 @@ def create_web_tables(conn):
             current_price DECIMAL(15,2) DEFAULT 0,
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
         )
-        """
-    )
-
-    cur.execute(
+        """,
         """
         CREATE TABLE IF NOT EXISTS stock_transactions (
             id BIGINT AUTO_INCREMENT PRIMARY KEY,
@@ -175,11 +520,7 @@ def create_web_tables(conn):
             tx_date DATE NOT NULL,
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
         )
-        """
-    )
-
-    # --- NEW TABLES FOR BANK ACCOUNTS AND LIABILITIES ---
-    cur.execute(
+        """,
         """
         CREATE TABLE IF NOT EXISTS bank_accounts (
             id BIGINT AUTO_INCREMENT PRIMARY KEY,
@@ -191,10 +532,7 @@ def create_web_tables(conn):
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
         )
-        """
-    )
-
-    cur.execute(
+        """,
         """
         CREATE TABLE IF NOT EXISTS credit_cards (
             id BIGINT AUTO_INCREMENT PRIMARY KEY,
@@ -207,33 +545,208 @@ def create_web_tables(conn):
             due_day INT,
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
         )
+        """,
+    ]),
+    # Loan details for the accounts page
+    (2, [
+        "ALTER TABLE loans ADD COLUMN bank_name VARCHAR(100)",
+        "ALTER TABLE loans ADD COLUMN due_day INT",
+        "ALTER TABLE loans ADD COLUMN penalty_amount DECIMAL(15,2) DEFAULT 0.00",
+        "ALTER TABLE loans ADD COLUMN overdue_days INT DEFAULT 0",
+    ]),
+    # Covering indexes for per-user date-range sums
+    (3, [
+        "ALTER TABLE income ADD INDEX idx_income_user_date (user_id, tx_date, amount)",
+        "ALTER TABLE expenses ADD INDEX idx_expenses_user_date (user_id, tx_date, amount)",
+    ]),
+    # Monthly income/expense rollups (maintained by src/rollup.py), backfilled
+    (4, [
         """
-    )
+        CREATE TABLE IF NOT EXISTS monthly_rollup (
+            user_id BIGINT NOT NULL,
+            month DATE NOT NULL,
+            kind VARCHAR(8) NOT NULL,
+            category VARCHAR(64) NOT NULL DEFAULT '',
+            total DECIMAL(17,2) NOT NULL DEFAULT 0.00,
+            tx_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, month, kind, category)
+        )
+        """,
+        """
+        INSERT INTO monthly_rollup (user_id, month, kind, category, total, tx_count)
+        SELECT user_id, CAST(DATE_FORMAT(tx_date, '%Y-%m-01') AS DATE) AS month, 'income',
+               COALESCE(category, ''), SUM(amount), COUNT(*)
+        FROM income WHERE tx_date IS NOT NULL
+        GROUP BY user_id, month, COALESCE(category, '')
+        """,
+        """
+        INSERT INTO monthly_rollup (user_id, month, kind, category, total, tx_count)
+        SELECT user_id, CAST(DATE_FORMAT(tx_date, '%Y-%m-01') AS DATE) AS month, 'expense',
+               COALESCE(category, ''), SUM(amount), COUNT(*)
+        FROM expenses WHERE tx_date IS NOT NULL
+        GROUP BY user_id, month, COALESCE(category, '')
+        """,
+    ]),
+    # Month of the totals each stored credit score was computed from
+    (5, [
+        "ALTER TABLE credit_score ADD COLUMN inputs_month DATE",
+        "ALTER TABLE credit_score ADD COLUMN computed_at TIMESTAMP NULL",
+    ]),
+    # Shared per-ticker quotes (src/quotes.py) and holding lookups by ticker
+    (6, [
+        """
+        CREATE TABLE IF NOT EXISTS market_quotes (
+            ticker VARCHAR(20) PRIMARY KEY,
+            price DECIMAL(15,2) NOT NULL,
+            quoted_at TIMESTAMP NULL
+        )
+        """,
+        "ALTER TABLE stocks ADD INDEX idx_stocks_user_ticker (user_id, ticker)",
+        "ALTER TABLE stocks ADD INDEX idx_stocks_ticker (ticker)",
+    ]),
+    # Realized P&L per position and daily portfolio valuations (src/portfolio.py)
+    (7, [
+        "ALTER TABLE stocks ADD COLUMN realized_pnl DECIMAL(15,2) NOT NULL DEFAULT 0.00",
+        """
+        CREATE TABLE IF NOT EXISTS portfolio_snapshots (
+            user_id BIGINT NOT NULL,
+            snapshot_date DATE NOT NULL,
+            invested DECIMAL(17,2) NOT NULL,
+            market_value DECIMAL(17,2) NOT NULL,
+            realized_pnl DECIMAL(17,2) NOT NULL,
+            PRIMARY KEY (user_id, snapshot_date),
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+        """,
+    ]),
+    # Keyset pagination of ledgers on (date, id), optionally filtered (src/history.py)
+    (8, [
+        "ALTER TABLE income ADD INDEX idx_income_user_date_id (user_id, tx_date, id)",
+        "ALTER TABLE income ADD INDEX idx_income_user_category (user_id, category, tx_date, id)",
+        "ALTER TABLE expenses ADD INDEX idx_expenses_user_date_id (user_id, tx_date, id)",
+        "ALTER TABLE expenses ADD INDEX idx_expenses_user_category (user_id, category, tx_date, id)",
+        "ALTER TABLE loans ADD INDEX idx_loans_user_start_id (user_id, start_date, id)",
+        "ALTER TABLE loans ADD INDEX idx_loans_user_bank (user_id, bank_name, start_date, id)",
+        "ALTER TABLE stock_transactions ADD INDEX idx_stock_tx_user_date_id (user_id, tx_date, id)",
+        "ALTER TABLE stock_transactions ADD INDEX idx_stock_tx_user_ticker (user_id, ticker, tx_date, id)",
+    ]),
+    # One position per user and ticker: merge duplicates left by concurrent
+    # first buys into the oldest row, then enforce it with a unique key
+    (9, [
+        """
+        UPDATE stocks s JOIN (
+            SELECT MIN(id) AS keep_id, SUM(quantity) AS quantity,
+                   SUM(quantity * avg_buy_price) / NULLIF(SUM(quantity), 0) AS avg_buy_price,
+                   SUM(realized_pnl) AS realized_pnl
+            FROM stocks GROUP BY user_id, ticker HAVING COUNT(*) > 1
+        ) d ON s.id = d.keep_id
+        SET s.quantity = d.quantity, s.avg_buy_price = COALESCE(ROUND(d.avg_buy_price, 2), s.avg_buy_price),
+            s.realized_pnl = d.realized_pnl
+        """,
+        """
+        DELETE s FROM stocks s JOIN (
+            SELECT user_id, ticker, MIN(id) AS keep_id FROM stocks GROUP BY user_id, ticker HAVING COUNT(*) > 1
+        ) d ON s.user_id = d.user_id AND s.ticker = d.ticker AND s.id <> d.keep_id
+        """,
+        "ALTER TABLE stocks DROP INDEX idx_stocks_user_ticker, ADD UNIQUE INDEX uq_stocks_user_ticker (user_id, ticker)",
+    ]),
+    # Drop indexes made redundant by version 8: dashboard sums read
+    # monthly_rollup since version 4, and the keyset indexes all lead with
+    # user_id, so neither the (user_id, tx_date, amount) nor the bare user_id
+    # indexes serve any query
+    (10, [
+        "ALTER TABLE income DROP INDEX idx_income_user_date",
+        "ALTER TABLE income DROP INDEX user_id",
+        "ALTER TABLE expenses DROP INDEX idx_expenses_user_date",
+        "ALTER TABLE expenses DROP INDEX user_id",
+        "ALTER TABLE loans DROP INDEX user_id",
+    ]),
+]
 
-    # Attempt to upgrade loans table if it exists but lacks columns
-    try:
-        cur.execute("ALTER TABLE loans ADD COLUMN bank_name VARCHAR(100)")
-    except pymysql.err.OperationalError:
-        pass  # Column likely exists
-    
-    try:
-        cur.execute("ALTER TABLE loans ADD COLUMN due_day INT")
-    except pymysql.err.OperationalError:
-        pass
+# Duplicate column / duplicate key name / dropped key does not exist
+_ALREADY_APPLIED = {1060, 1061, 1091}
+_NO_SUCH_TABLE = 1146
+_UNKNOWN_DATABASE = 1049
+
+
+class SchemaLockError(RuntimeError):
+    pass
 
+
+def _schema_version(cur, component):
     try:
-        cur.execute("ALTER TABLE loans ADD COLUMN penalty_amount DECIMAL(15,2) DEFAULT 0.00")
-    except pymysql.err.OperationalError:
-        pass
-        
+        cur.execute("SELECT version FROM schema_version WHERE component=%s", (component,))
+    except pymysql.err.ProgrammingError as e:
+        if e.args[0] != _NO_SUCH_TABLE:
+            raise
+        return None
+    row = cur.fetchone()
+    return row["version"] if row else 0
+
+
+def ensure_schema(conn, component, migrations):
+    # Brings component up to the last version in migrations. When the schema is
+    # already current this is a single primary-key lookup.
+    latest = migrations[-1][0]
+    cur = conn.cursor()
+    version = _schema_version(cur, component)
+    if version is not None and version >= latest:
+        cur.close()
+        conn.commit()
+        return version
+
+    # Serialize concurrent starts (e.g. during a rolling deploy). GET_LOCK
+    # returns 0 on timeout and NULL on error; either way the lock is not ours.
+    cur.execute("SELECT GET_LOCK('credit_engine_schema', 60) AS locked")
+    if cur.fetchone()["locked"] != 1:
+        cur.close()
+        raise SchemaLockError(f"Timed out waiting for the schema lock to migrate {component}")
     try:
-        cur.execute("ALTER TABLE loans ADD COLUMN overdue_days INT DEFAULT 0")
-    except pymysql.err.OperationalError:
-        pass
+        cur.execute(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "component VARCHAR(32) PRIMARY KEY, version INT NOT NULL)"
+        )
+        version = _schema_version(cur, component)
+        for number, statements in migrations:
+            if number <= version:
+                continue
+            for stmt in statements:
+                try:
+                    cur.execute(stmt)
+                except pymysql.err.MySQLError as e:
+                    if e.args[0] not in _ALREADY_APPLIED:
+                        raise
+            cur.execute(
+                "INSERT INTO schema_version (component, version) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE version=VALUES(version)",
+                (component, number),
+            )
+            conn.commit()
+            version = number
+    finally:
+        cur.execute("SELECT RELEASE_LOCK('credit_engine_schema')")
+        cur.close()
+    return version
 
-    cur.close()
-    conn.commit()
 
+def create_tables(conn):
+    return ensure_schema(conn, "pipeline", PIPELINE_MIGRATIONS)
 
 
+def create_web_tables(conn):
+    return ensure_schema(conn, "web", WEB_MIGRATIONS)
+
 
+def connect_schema(db_name="credit_engine", component="web"):
+    # Connects to db_name, creating the database only if it does not exist yet,
+    # and makes sure component's schema is current.
+    try:
+        conn = get_conn(db_name)
+    except pymysql.err.OperationalError as e:
+        if e.args[0] != _UNKNOWN_DATABASE:
+            raise
+        ensure_database(db_name)
+        conn = get_conn(db_name)
+    migrations = WEB_MIGRATIONS if component == "web" else PIPELINE_MIGRATIONS
+    ensure_schema(conn, component, migrations)
+    return conn
@@ -1,68 +1,191 @@
 import os
+import tempfile
+import time
 import pandas as pd
 import pymysql
 import numpy as np
 from src.db import create_tables, ensure_database, get_conn
 
 
-def load_csv_into_mysql(csv_path=os.path.join("data", "raw", "application_record.csv")):
+CSV_COLUMNS = [
+    "ID",
+    "CODE_GENDER",
+    "FLAG_OWN_CAR",
+    "FLAG_OWN_REALTY",
+    "CNT_CHILDREN",
+    "AMT_INCOME_TOTAL",
+    "NAME_INCOME_TYPE",
+    "NAME_EDUCATION_TYPE",
+    "NAME_FAMILY_STATUS",
+    "NAME_HOUSING_TYPE",
+    "DAYS_BIRTH",
+    "DAYS_EMPLOYED",
+    "FLAG_MOBIL",
+    "FLAG_WORK_PHONE",
+    "FLAG_PHONE",
+    "FLAG_EMAIL",
+    "OCCUPATION_TYPE",
+    "CNT_FAM_MEMBERS",
+]
+
+_APPLICATION_FIELDS = (
+    "id, code_gender, flag_own_car, flag_own_realty, cnt_children, "
+    "amt_income_total, name_income_type, name_education_type, name_family_status, name_housing_type, "
+    "days_birth, days_employed, flag_mobil, flag_work_phone, flag_phone, flag_email, occupation_type, cnt_fam_members"
+)
+
+_UPSERT_CLAUSE = (
+    "ON DUPLICATE KEY UPDATE code_gender=VALUES(code_gender), flag_own_car=VALUES(flag_own_car), "
+    "flag_own_realty=VALUES(flag_own_realty), cnt_children=VALUES(cnt_children), amt_income_total=VALUES(amt_income_total), "
+    "name_income_type=VALUES(name_income_type), name_education_type=VALUES(name_education_type), name_family_status=VALUES(name_family_status), "
+    "name_housing_type=VALUES(name_housing_type), days_birth=VALUES(days_birth), days_employed=VALUES(days_employed), "
+    "flag_mobil=VALUES(flag_mobil), flag_work_phone=VALUES(flag_work_phone), flag_phone=VALUES(flag_phone), flag_email=VALUES(flag_email), "
+    "occupation_type=VALUES(occupation_type), cnt_fam_members=VALUES(cnt_fam_members)"
+)
+
+INSERT_SQL = (
+    f"INSERT INTO applications ({_APPLICATION_FIELDS}) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+    + _UPSERT_CLAUSE
+)
+
+# LOAD DATA path: each chunk is written as a normalized CSV, bulk-loaded into a
+# session-private staging table and merged with one set-based upsert. The
+# staging table keeps file order in seq so later duplicates of an id win, exactly
+# as they do with executemany.
+_STAGING_DDL = (
+    "CREATE TEMPORARY TABLE applications_staging LIKE applications",
+    "ALTER TABLE applications_staging DROP PRIMARY KEY, ADD COLUMN seq BIGINT AUTO_INCREMENT PRIMARY KEY",
+)
+
+_LOAD_DATA_SQL = (
+    "LOAD DATA LOCAL INFILE %s INTO TABLE applications_staging "
+    "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+    "LINES TERMINATED BY '\\n' "
+    f"({_APPLICATION_FIELDS})"
+)
+
+_MERGE_SQL = (
+    f"INSERT INTO applications ({_APPLICATION_FIELDS}) "
+    f"SELECT {_APPLICATION_FIELDS} FROM applications_staging ORDER BY seq "
+    + _UPSERT_CLAUSE
+)
+
+# Server or client refused LOCAL INFILE (disabled by local_infile / not allowed).
+_LOCAL_INFILE_DISABLED = {1148, 2068, 3948}
+
+LOAD_MODES = ("executemany", "load_data")
+
+DEFAULT_CHUNK_ROWS = 5000
+
+# A chunk is held roughly four times while it is converted for the driver:
+# the parsed frame, the NaN-free object copy, .values and the tuple list.
+_CHUNK_COPIES = 4
+_SAMPLE_ROWS = 1000
+
+
+def chunk_rows_for_budget(csv_path, memory_mb):
+    sample = pd.read_csv(csv_path, usecols=CSV_COLUMNS, nrows=_SAMPLE_ROWS)
+    if sample.empty:
+        return DEFAULT_CHUNK_ROWS
+    bytes_per_row = sample.memory_usage(index=False, deep=True).sum() / len(sample)
+    return max(_SAMPLE_ROWS, int(memory_mb * 1024 * 1024 / (bytes_per_row * _CHUNK_COPIES)))
+
+
+def resolve_chunk_rows(csv_path, chunk_rows=None, memory_mb=None):
+    chunk_rows = chunk_rows or os.environ.get("ETL_CHUNK_ROWS")
+    if chunk_rows:
+        return int(chunk_rows)
+    memory_mb = memory_mb or os.environ.get("ETL_MEMORY_MB")
+    if memory_mb:
+        return chunk_rows_for_budget(csv_path, float(memory_mb))
+    return DEFAULT_CHUNK_ROWS
+
+
+def iter_csv_chunks(csv_path, chunk_rows):
+    # Yields DataFrames of at most chunk_rows rows with the columns in CSV_COLUMNS order.
+    for chunk in pd.read_csv(csv_path, usecols=CSV_COLUMNS, chunksize=chunk_rows):
+        yield chunk[CSV_COLUMNS]
+
+
+def chunk_to_rows(chunk):
+    # Replace NaN with None for MySQL compatibility
+    chunk = chunk.replace({np.nan: None})
+    return [tuple(row) for row in chunk.values]
+
+
+def _write_normalized_csv(chunk, path):
+    chunk.to_csv(path, header=False, index=False, na_rep="NULL", lineterminator="\n")
+
+
+def _load_executemany(conn, cur, chunks):
+    total_records = 0
+    for chunk in chunks:
+        cur.executemany(INSERT_SQL, chunk_to_rows(chunk))
+        conn.commit()
+        total_records += len(chunk)
+        print(f"ETL: Loaded {total_records} records...")
+    return total_records
+
+
+def _load_data_infile(conn, cur, chunks):
+    for stmt in _STAGING_DDL:
+        cur.execute(stmt)
+
+    fd, path = tempfile.mkstemp(prefix="applications_", suffix=".csv")
+    os.close(fd)
+    total_records = 0
+    try:
+        for chunk in chunks:
+            _write_normalized_csv(chunk, path)
+            cur.execute(_LOAD_DATA_SQL, (path,))
+            cur.execute(_MERGE_SQL)
+            conn.commit()
+            cur.execute("TRUNCATE TABLE applications_staging")
+            total_records += len(chunk)
+            print(f"ETL: Loaded {total_records} records...")
+    finally:
+        os.remove(path)
+    return total_records
+
+
+def load_csv_into_mysql(csv_path=os.path.join("data", "raw", "application_record.csv"), chunk_rows=None, memory_mb=None, mode=None):
+    # Streams the CSV in bounded chunks so peak memory depends on the chunk size,
+    # not the file size. chunk_rows wins over memory_mb; both fall back to the
+    # ETL_CHUNK_ROWS / ETL_MEMORY_MB environment variables.
+    #
+    # mode is "executemany" (default, works everywhere) or "load_data" (LOAD DATA
+    # LOCAL INFILE through a staging table; needs local_infile enabled on the
+    # server). ETL_MODE sets it from the environment. If the server refuses
+    # LOCAL INFILE before anything was loaded, the executemany path is used.
+    mode = mode or os.environ.get("ETL_MODE", "executemany")
+    if mode not in LOAD_MODES:
+        raise ValueError(f"Unknown ETL mode {mode!r}; expected one of {LOAD_MODES}")
+
     db_name = ensure_database()
-    conn = get_conn(db_name)
+    conn = get_conn(db_name, local_infile=(mode == "load_data"))
     create_tables(conn)
     cur = conn.cursor()
 
-    df = pd.read_csv(csv_path)
-
-    cols = [
-        "ID",
-        "CODE_GENDER",
-        "FLAG_OWN_CAR",
-        "FLAG_OWN_REALTY",
-        "CNT_CHILDREN",
-        "AMT_INCOME_TOTAL",
-        "NAME_INCOME_TYPE",
-        "NAME_EDUCATION_TYPE",
-        "NAME_FAMILY_STATUS",
-        "NAME_HOUSING_TYPE",
-        "DAYS_BIRTH",
-        "DAYS_EMPLOYED",
-        "FLAG_MOBIL",
-        "FLAG_WORK_PHONE",
-        "FLAG_PHONE",
-        "FLAG_EMAIL",
-        "OCCUPATION_TYPE",
-        "CNT_FAM_MEMBERS",
-    ]
-
-    df = df[cols]
-    
-    # Replace NaN with None for MySQL compatibility
-    df = df.replace({np.nan: None})
-
-    insert_sql = (
-        "INSERT INTO applications (id, code_gender, flag_own_car, flag_own_realty, cnt_children, "
-        "amt_income_total, name_income_type, name_education_type, name_family_status, name_housing_type, "
-        "days_birth, days_employed, flag_mobil, flag_work_phone, flag_phone, flag_email, occupation_type, cnt_fam_members) "
-        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
-        "ON DUPLICATE KEY UPDATE code_gender=VALUES(code_gender), flag_own_car=VALUES(flag_own_car), "
-        "flag_own_realty=VALUES(flag_own_realty), cnt_children=VALUES(cnt_children), amt_income_total=VALUES(amt_income_total), "
-        "name_income_type=VALUES(name_income_type), name_education_type=VALUES(name_education_type), name_family_status=VALUES(name_family_status), "
-        "name_housing_type=VALUES(name_housing_type), days_birth=VALUES(days_birth), days_employed=VALUES(days_employed), "
-        "flag_mobil=VALUES(flag_mobil), flag_work_phone=VALUES(flag_work_phone), flag_phone=VALUES(flag_phone), flag_email=VALUES(flag_email), "
-        "occupation_type=VALUES(occupation_type), cnt_fam_members=VALUES(cnt_fam_members)"
-    )
-
-    data = [tuple(row) for row in df.values]
+    chunk_rows = resolve_chunk_rows(csv_path, chunk_rows, memory_mb)
+    chunks = iter_csv_chunks(csv_path, chunk_rows)
+    started = time.perf_counter()
 
     try:
-        batch_size = 5000
-        total_records = len(data)
-        for i in range(0, total_records, batch_size):
-            batch = data[i:i + batch_size]
-            cur.executemany(insert_sql, batch)
-            conn.commit()
-            print(f"ETL: Loaded {min(i + batch_size, total_records)} / {total_records} records...")
-            
+        if mode == "load_data":
+            try:
+                total_records = _load_data_infile(conn, cur, chunks)
+            except pymysql.err.OperationalError as e:
+                if e.args[0] not in _LOCAL_INFILE_DISABLED:
+                    raise
+                conn.rollback()
+                print(f"ETL: LOAD DATA LOCAL INFILE unavailable ({e.args[1]}); falling back to executemany.")
+                mode = "executemany"
+                chunks = iter_csv_chunks(csv_path, chunk_rows)
+                total_records = _load_executemany(conn, cur, chunks)
+        else:
+            total_records = _load_executemany(conn, cur, chunks)
+
     except pymysql.Error as e:
         conn.rollback()
         raise e
@@ -70,3 +193,7 @@ def load_csv_into_mysql(csv_path=os.path.join("data", "raw", "application_record
         cur.close()
         conn.close()
 
+    elapsed = time.perf_counter() - started
+    rate = total_records / elapsed if elapsed > 0 else 0.0
+    print(f"ETL: {total_records} records in {elapsed:.2f}s ({rate:,.0f} rows/sec, mode={mode})")
+    return total_records
@@ -1,52 +1,71 @@
-from src.db import get_conn
+import functools
 
+import numpy as np
 
-def _finance_for_row(row):
-    income = float(row["amt_income_total"] or 0.0)
-    age = max(0, int(-int(row["days_birth"] or 0) // 365))
-    dependents = int(row["cnt_children"] or 0)
+from src.parallel import recompute, write_range
 
-    essentials = round(income * 0.5, 2)
-    wants = round(income * 0.3, 2)
-    savings = round(income * 0.2, 2)
-    return income, essentials, wants, savings, age, dependents
 
+def _round2(values):
+    # np.round scales by 100 before rounding, which can land on the other side of
+    # a .5 tie than Python's round(); redo those few elements the scalar way.
+    out = np.round(values, 2)
+    scaled = values * 100.0
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= 1e-9 + np.abs(scaled) * 1e-12
+    if near_tie.any():
+        out[near_tie] = [round(v, 2) for v in values[near_tie].tolist()]
+    return out
 
-def compute_all():
-    conn = get_conn("credit_engine")
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT id, amt_income_total, days_birth, cnt_children FROM applications"
-    )
-    rows = cur.fetchall()
 
-    upsert_sql = (
-        "INSERT INTO finance_metrics (id, monthly_income, essentials, wants, savings, age, dependents) "
-        "VALUES (%s, %s, %s, %s, %s, %s, %s) "
-        "ON DUPLICATE KEY UPDATE monthly_income=VALUES(monthly_income), essentials=VALUES(essentials), "
-        "wants=VALUES(wants), savings=VALUES(savings), age=VALUES(age), dependents=VALUES(dependents)"
-    )
+def finance_batch(amt_income, days_birth, children):
+    # Splits income 50/30/20 into essentials, wants and savings, each rounded
+    # like Python's round(x, 2). Inputs are array-likes of equal length with
+    # missing values already replaced by 0; returns
+    # (income, essentials, wants, savings, age, dependents) arrays.
+    income = np.asarray(amt_income, dtype=np.float64)
+    days_birth = np.asarray(days_birth, dtype=np.int64)
+    dependents = np.asarray(children, dtype=np.int64)
+
+    essentials = _round2(income * 0.5)
+    wants = _round2(income * 0.3)
+    savings = _round2(income * 0.2)
+    ages = np.maximum(0, -days_birth // 365)
+    return income, essentials, wants, savings, ages, dependents
 
-    data = []
-    batch_size = 5000
-    total_rows = len(rows)
 
-    for i, r in enumerate(rows):
-        income, essentials, wants, savings, age, deps = _finance_for_row(r)
-        data.append((r["id"], income, essentials, wants, savings, age, deps))
+_SELECT_SQL = (
+    "SELECT a.id, COALESCE(a.amt_income_total, 0), COALESCE(a.days_birth, 0), "
+    "COALESCE(a.cnt_children, 0), a.score_inputs_hash FROM applications a"
+)
 
-        if len(data) >= batch_size:
-            cur.executemany(upsert_sql, data)
-            conn.commit()
-            data = []
-            print(f"Finance: Processed {i + 1} / {total_rows}...")
+# Incremental runs only pick applicants without metrics or whose inputs changed since.
+_CHANGED_JOIN = " LEFT JOIN finance_metrics f ON f.id = a.id"
+_CHANGED_FILTER = "(f.inputs_hash IS NULL OR f.inputs_hash <> a.score_inputs_hash)"
 
-    if data:
-        cur.executemany(upsert_sql, data)
-        conn.commit()
-        print(f"Finance: Processed {total_rows} / {total_rows}...")
+UPSERT_SQL = (
+    "INSERT INTO finance_metrics (id, monthly_income, essentials, wants, savings, age, dependents, inputs_hash) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE monthly_income=VALUES(monthly_income), essentials=VALUES(essentials), "
+    "wants=VALUES(wants), savings=VALUES(savings), age=VALUES(age), dependents=VALUES(dependents), "
+    "inputs_hash=VALUES(inputs_hash)"
+)
 
-    cur.close()
-    conn.close()
+# Full recomputes in swap mode fill a fresh shadow table, so no upsert is needed.
+_INSERT_SQL = (
+    "INSERT INTO {table} (id, monthly_income, essentials, wants, savings, age, dependents, inputs_hash) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+)
 
 
+def _finance_rows(rows):
+    # rows are (id, amt_income_total, days_birth, cnt_children, score_inputs_hash) tuples.
+    ids, amt_income, days_birth, children, hashes = zip(*rows)
+    columns = finance_batch(amt_income, days_birth, children)
+    return list(zip(ids, *(c.tolist() for c in columns), hashes))
+
+
+def compute_all(batch_size=5000, incremental=False, workers=1, write_mode="upsert"):
+    # Fills finance_metrics from applications; see parallel.recompute for the modes.
+    stage = functools.partial(
+        write_range, "Finance", _SELECT_SQL, (_CHANGED_JOIN, _CHANGED_FILTER), _finance_rows, UPSERT_SQL, _INSERT_SQL
+    )
+    return recompute("finance_metrics", "Finance", stage, batch_size, incremental, workers, write_mode)
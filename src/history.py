@@ -0,0 +1,95 @@
+import base64
+import datetime
+import decimal
+import json
+
+
+# Keyset-paginated listing of a user's ledgers, newest first. Pages are ordered
+# by (date, id) descending and continue from the last row of the previous page
+# rather than an OFFSET, so every page is an index range scan of the same cost.
+# Rows without a date sort last, as MySQL orders NULLs in descending order.
+
+LEDGERS = {
+    # name: (table, date column, filter column, selected columns)
+    "income": ("income", "tx_date", "category", "id, amount, category, tx_date"),
+    "expenses": ("expenses", "tx_date", "category", "id, amount, category, tx_date"),
+    "loans": (
+        "loans", "start_date", "bank_name",
+        "id, principal, monthly_emi, interest_rate, start_date, bank_name, due_day, penalty_amount, overdue_days",
+    ),
+    "stock_transactions": ("stock_transactions", "tx_date", "ticker", "id, ticker, tx_type, quantity, price, tx_date"),
+}
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class HistoryError(ValueError):
+    pass
+
+
+def encode_cursor(date, row_id):
+    raw = json.dumps([date.isoformat() if date else None, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        date, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return (datetime.date.fromisoformat(date) if date else None), int(row_id)
+    except (ValueError, TypeError):
+        raise HistoryError("Invalid cursor.")
+
+
+def _json_value(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+def fetch_page(conn, ledger, user_id, cursor=None, limit=DEFAULT_PAGE_SIZE, date_from=None, date_to=None, match=None):
+    # date_from / date_to are inclusive dates; match filters on the ledger's
+    # filter column (category, bank_name or ticker). Returns the page's rows
+    # and the cursor of the next page, or None on the last page.
+    if ledger not in LEDGERS:
+        raise HistoryError(f"Unknown ledger {ledger!r}; expected one of {sorted(LEDGERS)}.")
+    table, date_col, filter_col, columns = LEDGERS[ledger]
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    where = ["user_id=%s"]
+    args = [user_id]
+    if match is not None:
+        where.append(f"{filter_col}=%s")
+        args.append(match)
+    if date_from is not None:
+        where.append(f"{date_col} >= %s")
+        args.append(date_from)
+    if date_to is not None:
+        where.append(f"{date_col} <= %s")
+        args.append(date_to)
+    if cursor:
+        last_date, last_id = decode_cursor(cursor)
+        if last_date is None:
+            where.append(f"{date_col} IS NULL AND id < %s")
+            args.append(last_id)
+        else:
+            where.append(f"({date_col} < %s OR ({date_col} = %s AND id < %s) OR {date_col} IS NULL)")
+            args.extend([last_date, last_date, last_id])
+
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT {columns} FROM {table} WHERE {' AND '.join(where)} "
+        f"ORDER BY {date_col} DESC, id DESC LIMIT %s",
+        args + [limit + 1],
+    )
+    rows = cur.fetchall()
+    cur.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][date_col], rows[-1]["id"])
+    items = [{k: _json_value(v) for k, v in row.items()} for row in rows]
+    return items, next_cursor
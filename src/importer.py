@@ -0,0 +1,87 @@
+import datetime
+from decimal import Decimal
+
+from src.records import MAX_MONEY, iter_records, positive_decimal
+from src.rollup import KINDS, add_many_to_rollup, month_of
+
+
+# Bulk import of bank-statement rows into income and expenses. A statement is
+# a CSV file with a header row, or a JSON array of objects, with the fields
+#   date (YYYY-MM-DD), amount (> 0), type (income | expense), category (optional)
+# Rows are validated as they are parsed and inserted in batches inside the
+# caller's transaction, so a bad row aborts the whole import.
+
+IMPORT_BATCH_ROWS = 1000
+
+_INSERT_SQL = "INSERT INTO {table} (user_id, amount, category, tx_date) VALUES (%s, %s, %s, %s)"
+_MAX_CATEGORY = 64
+
+
+class StatementError(ValueError):
+    pass
+
+
+def _parse_record(record, where):
+    if not isinstance(record, dict):
+        raise StatementError(f"{where}: expected an object with date, amount and type.")
+
+    kind = str(record.get("type") or "").strip().lower()
+    if kind not in KINDS:
+        raise StatementError(f"{where}: type must be 'income' or 'expense'.")
+
+    try:
+        tx_date = datetime.date.fromisoformat(str(record.get("date") or "").strip())
+    except ValueError:
+        raise StatementError(f"{where}: date must be YYYY-MM-DD.")
+
+    try:
+        amount = positive_decimal(record.get("amount"), "amount", maximum=MAX_MONEY)
+    except ValueError as e:
+        raise StatementError(f"{where}: {e}")
+
+    category = str(record.get("category") or "").strip() or "Other"
+    if len(category) > _MAX_CATEGORY:
+        raise StatementError(f"{where}: category is longer than {_MAX_CATEGORY} characters.")
+
+    return kind, tx_date, amount, category
+
+
+def _json_rows(records):
+    if not isinstance(records, list):
+        raise StatementError("JSON statement must be an array of rows.")
+    for i, record in enumerate(records, start=1):
+        yield record, f"Row {i}"
+
+
+def iter_statement(stream, filename):
+    # Yields validated (kind, tx_date, amount, category) tuples. CSV files are
+    # decoded and parsed incrementally; JSON needs the whole array in memory.
+    for record, where in iter_records(stream, filename, StatementError, _json_rows):
+        yield _parse_record(record, where)
+
+
+def import_statement(cur, user_id, rows, batch_rows=IMPORT_BATCH_ROWS):
+    # Inserts rows in executemany batches and updates monthly_rollup once per
+    # (kind, month, category). Does not commit; returns counts per kind.
+    batches = {kind: [] for kind in KINDS}
+    rollup = {}
+    counts = {kind: 0 for kind in KINDS}
+
+    def flush(kind):
+        cur.executemany(_INSERT_SQL.format(table=KINDS[kind]), batches[kind])
+        batches[kind].clear()
+
+    for kind, tx_date, amount, category in rows:
+        batches[kind].append((user_id, amount, category, tx_date))
+        counts[kind] += 1
+        key = (kind, month_of(tx_date), category)
+        total, count = rollup.get(key, (Decimal(0), 0))
+        rollup[key] = (total + amount, count + 1)
+        if len(batches[kind]) >= batch_rows:
+            flush(kind)
+
+    for kind in KINDS:
+        if batches[kind]:
+            flush(kind)
+    add_many_to_rollup(cur, user_id, rollup)
+    return counts
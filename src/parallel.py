@@ -0,0 +1,140 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from src import profiling
+from src.db import WRITE_MODES, create_shadow_table, iter_batches, pooled_conn, swap_shadow_table
+
+
+# Ranges per worker; more ranges than workers evens out gaps in the id space.
+_RANGES_PER_WORKER = 4
+
+_RANGE_FILTER = "a.id >= %s AND a.id < %s"
+
+
+def resolve_workers(workers=None):
+    workers = workers or os.environ.get("PIPELINE_WORKERS")
+    return max(1, int(workers or 1))
+
+
+def id_ranges(parts, table="applications"):
+    # Splits [MIN(id), MAX(id)] of table into at most parts half-open ranges.
+    conn = pooled_conn()
+    cur = conn.cursor()
+    cur.execute(f"SELECT MIN(id) AS lo, MAX(id) AS hi FROM {table}")
+    row = cur.fetchone()
+    cur.close()
+    conn.close()
+
+    if row["lo"] is None:
+        return []
+    lo, hi = int(row["lo"]), int(row["hi"]) + 1
+    step = max(1, -(-(hi - lo) // parts))
+    return [(start, min(start + step, hi)) for start in range(lo, hi, step)]
+
+
+def _run_range(stage, kwargs):
+    stats = profiling.StageStats(getattr(stage, "__name__", "range"))
+    with profiling.collect(stats):
+        rows = stage(**kwargs)
+    return rows, stats.db_round_trips, stats.db_wait_s
+
+
+def run_partitioned(stage, workers, **kwargs):
+    # Runs stage(id_range=(lo, hi), **kwargs) for every id range in a process
+    # pool. stage must be a module-level function (or a functools.partial of
+    # one) that opens its own connections and returns the number of rows it
+    # processed. DB time spent in the workers is added to the caller's
+    # profiling stage.
+    ranges = id_ranges(workers * _RANGES_PER_WORKER)
+    total_rows = 0
+    profiling.record_workers(min(workers, len(ranges)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_range, stage, dict(kwargs, id_range=id_range)) for id_range in ranges]
+        for future in futures:
+            rows, round_trips, wait_s = future.result()
+            profiling.record_db(round_trips, wait_s)
+            total_rows += rows
+    return total_rows
+
+
+def _select_sql(select_sql, changed, incremental, id_range):
+    # select_sql reads applications as "a"; changed is the (join, filter) pair
+    # that keeps only applicants whose output row is missing or stale.
+    filters = []
+    if incremental:
+        select_sql += changed[0]
+        filters.append(changed[1])
+    if id_range:
+        filters.append(_RANGE_FILTER)
+    if filters:
+        select_sql += " WHERE " + " AND ".join(filters)
+    return select_sql
+
+
+def write_range(label, select_sql, changed, to_rows, upsert_sql, insert_sql, batch_size, incremental,
+                id_range=None, target=None):
+    # Reads applications in batches, turns each batch into output rows with
+    # to_rows and writes them: plain inserts into target (a shadow table from
+    # create_shadow_table, formatted into insert_sql) when given, otherwise
+    # upsert_sql. Bind the leading arguments with functools.partial to get a
+    # stage for run_partitioned.
+    read_conn = pooled_conn()
+    conn = pooled_conn()
+    cur = conn.cursor()
+    total_rows = 0
+    if id_range:
+        label = f"{label} [{id_range[0]}, {id_range[1]})"
+    write_sql = insert_sql.format(table=target) if target else upsert_sql
+
+    try:
+        for rows in iter_batches(read_conn, _select_sql(select_sql, changed, incremental, id_range), id_range,
+                                 batch_size=batch_size):
+            cur.executemany(write_sql, to_rows(rows))
+            conn.commit()
+            total_rows += len(rows)
+            print(f"{label}: Processed {total_rows} records...")
+    finally:
+        cur.close()
+        conn.close()
+        read_conn.close()
+
+    return total_rows
+
+
+def recompute(table, label, stage, batch_size=5000, incremental=False, workers=1, write_mode="upsert"):
+    # Runs stage (a write_range partial writing table) over all applications,
+    # or only the changed ones with incremental=True. workers > 1 splits
+    # applications into id ranges processed by a pool of that many processes.
+    # write_mode="swap" (full recomputes only) builds a shadow copy of table
+    # and swaps it in atomically once every row is written.
+    if write_mode not in WRITE_MODES:
+        raise ValueError(f"Unknown write mode {write_mode!r}; expected one of {WRITE_MODES}")
+    if write_mode == "swap" and incremental:
+        raise ValueError("write_mode='swap' rewrites the whole table and cannot be incremental")
+
+    target = None
+    if write_mode == "swap":
+        conn = pooled_conn()
+        target = create_shadow_table(conn, table)
+        conn.close()
+
+    if workers > 1:
+        total_rows = run_partitioned(stage, workers, batch_size=batch_size, incremental=incremental, target=target)
+    else:
+        total_rows = stage(batch_size=batch_size, incremental=incremental, target=target)
+
+    if target:
+        conn = pooled_conn()
+        swap_shadow_table(conn, table)
+        conn.close()
+
+    if incremental:
+        conn = pooled_conn()
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) AS total FROM applications")
+        skipped = cur.fetchone()["total"] - total_rows
+        cur.close()
+        conn.close()
+        print(f"{label}: Skipped {skipped} unchanged records.")
+
+    return total_rows
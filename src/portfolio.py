@@ -0,0 +1,189 @@
+import argparse
+import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from dotenv import load_dotenv
+
+from src.db import get_conn
+from src.records import CENTS, MAX_MONEY, MAX_QUANTITY, QUANTITY_STEP, positive_decimal
+
+
+# Per-user stock positions kept current as trades are recorded. Each stocks row
+# is the running aggregate of one ticker's BUY/SELL history: quantity, average
+# cost (avg_buy_price) and realized P&L. Fully sold positions keep their row at
+# quantity 0 so realized P&L survives. portfolio_snapshots stores one valuation
+# per user and day, so history is read from there instead of replaying trades.
+
+_POSITION_SQL = "SELECT id, quantity, avg_buy_price, realized_pnl FROM stocks WHERE user_id=%s AND ticker=%s FOR UPDATE"
+_OPEN_POSITION_SQL = (
+    "INSERT INTO stocks (user_id, ticker, quantity, avg_buy_price, current_price) VALUES (%s, %s, 0, 0, %s) "
+    "ON DUPLICATE KEY UPDATE id=id"
+)
+_TRADE_SQL = (
+    "INSERT INTO stock_transactions (user_id, ticker, tx_type, quantity, price, tx_date) "
+    "VALUES (%s, %s, %s, %s, %s, %s)"
+)
+
+# Valuation at shared market quotes, falling back to the holding's own price
+_TOTALS_SQL = (
+    "SELECT s.user_id, "
+    "COALESCE(SUM(s.quantity * s.avg_buy_price), 0) AS invested, "
+    "COALESCE(SUM(s.quantity * COALESCE(q.price, s.current_price)), 0) AS market_value, "
+    "COALESCE(SUM(s.realized_pnl), 0) AS realized_pnl "
+    "FROM stocks s LEFT JOIN market_quotes q ON q.ticker = s.ticker "
+    "{where} GROUP BY s.user_id"
+)
+
+_SNAPSHOT_SQL = (
+    "INSERT INTO portfolio_snapshots (user_id, snapshot_date, invested, market_value, realized_pnl) "
+    "SELECT user_id, %s, ROUND(invested, 2), ROUND(market_value, 2), realized_pnl FROM ({totals}) t "
+    "ON DUPLICATE KEY UPDATE invested=VALUES(invested), market_value=VALUES(market_value), "
+    "realized_pnl=VALUES(realized_pnl)"
+)
+
+
+def apply_trade(position, tx_type, qty, price):
+    # position is (quantity, avg_buy_price, realized_pnl) as Decimals, rounded
+    # to the stocks column scales exactly as MySQL stores them.
+    quantity, avg_price, realized = position
+    if tx_type == "BUY":
+        new_qty = quantity + qty
+        avg_price = ((quantity * avg_price + qty * price) / new_qty).quantize(CENTS, rounding=ROUND_HALF_UP)
+        return new_qty, avg_price, realized
+    realized += ((price - avg_price) * qty).quantize(CENTS, rounding=ROUND_HALF_UP)
+    return quantity - qty, avg_price, realized
+
+
+def _as_trade(qty, price):
+    qty = positive_decimal(qty, "Quantity", step=QUANTITY_STEP, maximum=MAX_QUANTITY)
+    price = positive_decimal(price, "Price", maximum=MAX_MONEY)
+    return qty, price
+
+
+def record_buy(cur, user_id, ticker, qty, price, tx_date):
+    # Raises ValueError for an invalid quantity or price. Does not commit.
+    qty, price = _as_trade(qty, price)
+    cur.execute(_TRADE_SQL, (user_id, ticker, "BUY", qty, price, tx_date))
+    cur.execute(_POSITION_SQL, (user_id, ticker))
+    existing = cur.fetchone()
+    if not existing:
+        # No row to lock yet. Concurrent first buys meet on the unique
+        # (user_id, ticker) key: the loser's insert waits for the winner's row,
+        # and both then update that one position.
+        cur.execute(_OPEN_POSITION_SQL, (user_id, ticker, price))
+        cur.execute(_POSITION_SQL, (user_id, ticker))
+        existing = cur.fetchone()
+    quantity, avg_price, _ = apply_trade(
+        (existing["quantity"], existing["avg_buy_price"], existing["realized_pnl"]), "BUY", qty, price
+    )
+    cur.execute(
+        "UPDATE stocks SET quantity=%s, avg_buy_price=%s, current_price=%s WHERE id=%s",
+        (quantity, avg_price, price, existing["id"]),
+    )
+
+
+def record_sell(cur, user_id, ticker, qty, price, tx_date):
+    # Returns False, writing nothing, if the position is smaller than qty.
+    # Raises ValueError for an invalid quantity or price. Does not commit.
+    qty, price = _as_trade(qty, price)
+    cur.execute(_POSITION_SQL, (user_id, ticker))
+    existing = cur.fetchone()
+    if not existing or existing["quantity"] < qty:
+        return False
+    cur.execute(_TRADE_SQL, (user_id, ticker, "SELL", qty, price, tx_date))
+    quantity, _, realized = apply_trade(
+        (existing["quantity"], existing["avg_buy_price"], existing["realized_pnl"]), "SELL", qty, price
+    )
+    cur.execute(
+        "UPDATE stocks SET quantity=%s, current_price=%s, realized_pnl=%s WHERE id=%s",
+        (quantity, price, realized, existing["id"]),
+    )
+    return True
+
+
+def portfolio_totals(cur, user_id):
+    cur.execute(_TOTALS_SQL.format(where="WHERE s.user_id=%s"), (user_id,))
+    row = cur.fetchone() or {}
+    return {
+        "invested": row.get("invested", Decimal(0)),
+        "market_value": row.get("market_value", Decimal(0)),
+        "realized_pnl": row.get("realized_pnl", Decimal(0)),
+    }
+
+
+def snapshot(cur, user_id=None, day=None):
+    # Upserts day's (default: today) valuation for one user or, with user_id
+    # None, for every user holding stocks in a single INSERT ... SELECT.
+    day = day or datetime.date.today()
+    if user_id is None:
+        cur.execute(_SNAPSHOT_SQL.format(totals=_TOTALS_SQL.format(where="")), (day,))
+    else:
+        cur.execute(_SNAPSHOT_SQL.format(totals=_TOTALS_SQL.format(where="WHERE s.user_id=%s")), (day, user_id))
+    return cur.rowcount
+
+
+def portfolio_history(cur, user_id, since):
+    cur.execute(
+        "SELECT snapshot_date, invested, market_value, realized_pnl FROM portfolio_snapshots "
+        "WHERE user_id=%s AND snapshot_date >= %s ORDER BY snapshot_date",
+        (user_id, since),
+    )
+    return cur.fetchall()
+
+
+def rebuild_positions(conn, user_id):
+    # Replays a user's stock_transactions into fresh positions, e.g. to
+    # backfill realized P&L for trades recorded before it was tracked.
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT ticker, tx_type, quantity, price FROM stock_transactions WHERE user_id=%s ORDER BY tx_date, id",
+        (user_id,),
+    )
+    positions = {}
+    last_price = {}
+    for tx in cur.fetchall():
+        position = positions.get(tx["ticker"], (Decimal(0), Decimal(0), Decimal(0)))
+        positions[tx["ticker"]] = apply_trade(position, tx["tx_type"], tx["quantity"], tx["price"])
+        last_price[tx["ticker"]] = tx["price"]
+
+    cur.execute("SELECT ticker, current_price FROM stocks WHERE user_id=%s FOR UPDATE", (user_id,))
+    current_price = {row["ticker"]: row["current_price"] for row in cur.fetchall()}
+    for ticker, (quantity, avg_price, realized) in positions.items():
+        cur.execute("DELETE FROM stocks WHERE user_id=%s AND ticker=%s", (user_id, ticker))
+        cur.execute(
+            "INSERT INTO stocks (user_id, ticker, quantity, avg_buy_price, current_price, realized_pnl) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            (user_id, ticker, quantity, avg_price, current_price.get(ticker, last_price[ticker]), realized),
+        )
+    conn.commit()
+    cur.close()
+    return len(positions)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Portfolio snapshots and position rebuilds.")
+    parser.add_argument("command", choices=["snapshot", "rebuild"])
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--date", default=None, help="YYYY-MM-DD snapshot date (default: today)")
+    args = parser.parse_args()
+
+    conn = get_conn("credit_engine")
+    if args.command == "snapshot":
+        day = datetime.date.fromisoformat(args.date) if args.date else None
+        cur = conn.cursor()
+        snapshot(cur, args.user_id, day)
+        conn.commit()
+        cur.close()
+        print(f"Portfolio: snapshot taken for {day or datetime.date.today()}.")
+    else:
+        cur = conn.cursor()
+        if args.user_id is None:
+            cur.execute("SELECT DISTINCT user_id FROM stock_transactions")
+            user_ids = [row["user_id"] for row in cur.fetchall()]
+        else:
+            user_ids = [args.user_id]
+        cur.close()
+        total = sum(rebuild_positions(conn, user_id) for user_id in user_ids)
+        print(f"Portfolio: rebuilt {total} positions for {len(user_ids)} users.")
+    conn.close()
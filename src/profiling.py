@@ -0,0 +1,151 @@
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Stage that DB calls are currently attributed to. Module-level rather than
+# per-thread so calls made from helper threads are counted too.
+_active = None
+_lock = threading.Lock()
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.db_round_trips = 0
+        self.db_wait_s = 0.0
+        self.workers = 1
+        self.process_peak_rss_mb = None
+        self.peak_rss_growth_mb = None
+
+    def add_db(self, round_trips, wait_s):
+        with _lock:
+            self.db_round_trips += round_trips
+            self.db_wait_s += wait_s
+
+    def as_dict(self):
+        # With workers > 1, db_wait_s is summed over overlapping workers and can
+        # exceed wall_s, so compute_s is left out and the mean per worker shown.
+        # RSS figures are process-wide: the high-water mark after the stage and
+        # how much the stage raised it.
+        parallel = self.workers > 1
+        return {
+            "stage": self.name,
+            "rows": self.rows,
+            "wall_s": round(self.wall_s, 3),
+            "cpu_s": round(self.cpu_s, 3),
+            "rows_per_sec": round(self.rows / self.wall_s, 1) if self.wall_s > 0 else 0.0,
+            "db_round_trips": self.db_round_trips,
+            "workers": self.workers,
+            "db_wait_s": round(self.db_wait_s, 3),
+            "db_wait_per_worker_s": round(self.db_wait_s / self.workers, 3),
+            "compute_s": None if parallel else round(max(0.0, self.wall_s - self.db_wait_s), 3),
+            "process_peak_rss_mb": self.process_peak_rss_mb,
+            "peak_rss_growth_mb": self.peak_rss_growth_mb,
+        }
+
+
+def _cpu_time():
+    # Includes terminated child processes, e.g. a finished worker pool.
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+@contextmanager
+def collect(stats):
+    # Attributes DB calls made inside the block to stats.
+    global _active
+    previous = _active
+    _active = stats
+    try:
+        yield stats
+    finally:
+        _active = previous
+
+
+@contextmanager
+def db_call(round_trips=1):
+    # Wraps one blocking call to MySQL; free when no stage is being profiled.
+    stats = _active
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_db(round_trips, time.perf_counter() - started)
+
+
+def record_workers(workers):
+    # Marks the active stage as run by that many concurrent worker processes.
+    if _active is not None:
+        _active.workers = max(_active.workers, workers)
+
+
+def record_db(round_trips, wait_s):
+    # Adds DB time measured elsewhere, e.g. in a worker process.
+    if _active is not None:
+        _active.add_db(round_trips, wait_s)
+
+
+class PipelineProfiler:
+    def __init__(self):
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        stats = StageStats(name)
+        wall_started = time.perf_counter()
+        cpu_started = _cpu_time()
+        rss_started = _peak_rss_mb()
+        try:
+            with collect(stats):
+                yield stats
+        finally:
+            stats.wall_s = time.perf_counter() - wall_started
+            stats.cpu_s = _cpu_time() - cpu_started
+            stats.process_peak_rss_mb = _peak_rss_mb()
+            if rss_started is not None:
+                stats.peak_rss_growth_mb = round(stats.process_peak_rss_mb - rss_started, 1)
+            self.stages.append(stats)
+
+    def report(self):
+        stages = [s.as_dict() for s in self.stages]
+        return {
+            "started_at": self.started_at.isoformat(),
+            "total_wall_s": round(sum(s.wall_s for s in self.stages), 3),
+            "peak_rss_mb": _peak_rss_mb(),
+            "stages": stages,
+        }
+
+    def write_report(self, path):
+        report = self.report()
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return report
@@ -0,0 +1,159 @@
+import datetime
+from dataclasses import dataclass, field
+from typing import Optional
+
+from src.db import fan_out
+
+
+# Page-level reads for the web app. Each fetch_* function gathers everything a
+# page needs in one round-trip to MySQL: either a single statement with scalar
+# subqueries or, where the page shows several result sets, one multi-statement
+# query. fetch_accounts needs a connection from the multi-statement pool
+# (get_pool(..., multi_statements=True)); everything else uses the general one.
+# The *_fan_out variants instead run the same reads as separate statements
+# concurrently on several pooled connections (src.db.fan_out).
+
+
+@dataclass
+class DashboardData:
+    age: Optional[int]
+    monthly_income: float
+    employment_type: str
+    total_income: float
+    total_expenses: float
+    total_emi: float
+    # Stored credit_score row, if any
+    score: Optional[int] = None
+    band: Optional[str] = None
+    dti: float = 0.0
+    emi_burden: float = 0.0
+    savings_rate: float = 0.0
+    score_month: Optional[datetime.date] = None
+
+
+@dataclass
+class AccountsData:
+    banks: list = field(default_factory=list)
+    cards: list = field(default_factory=list)
+    loans: list = field(default_factory=list)
+    total_liquidity: float = 0.0
+    total_debt: float = 0.0
+
+
+# Dashboard sums as scalar subqueries; {id} is the user id expression
+_MONTH_TOTAL_SQL = "SELECT COALESCE(SUM(total),0) FROM monthly_rollup WHERE user_id={id} AND month=%s AND kind='{kind}'"
+_EMI_TOTAL_SQL = "SELECT COALESCE(SUM(monthly_emi),0) FROM loans WHERE user_id={id}"
+
+_PROFILE_COLUMNS = (
+    "u.age, u.monthly_income, u.employment_type, "
+    "cs.score, cs.risk_band, cs.dti, cs.emi_burden, cs.savings_rate, cs.inputs_month"
+)
+_PROFILE_FROM = (
+    "FROM (SELECT %s AS id) k LEFT JOIN users u ON u.id = k.id "
+    "LEFT JOIN credit_score cs ON cs.user_id = k.id"
+)
+
+_DASHBOARD_SQL = (
+    f"SELECT {_PROFILE_COLUMNS}, "
+    f"({_MONTH_TOTAL_SQL.format(id='k.id', kind='income')}) AS total_income, "
+    f"({_MONTH_TOTAL_SQL.format(id='k.id', kind='expense')}) AS total_expenses, "
+    f"({_EMI_TOTAL_SQL.format(id='k.id')}) AS total_emi "
+    f"{_PROFILE_FROM}"
+)
+
+_DASHBOARD_FAN_OUT = [
+    f"SELECT {_PROFILE_COLUMNS} {_PROFILE_FROM}",
+    f"SELECT ({_MONTH_TOTAL_SQL.format(id='%s', kind='income')}) AS total_income",
+    f"SELECT ({_MONTH_TOTAL_SQL.format(id='%s', kind='expense')}) AS total_expenses",
+    f"SELECT ({_EMI_TOTAL_SQL.format(id='%s')}) AS total_emi",
+]
+
+_ACCOUNTS_STATEMENTS = [
+    "SELECT * FROM bank_accounts WHERE user_id=%s ORDER BY bank_name",
+    "SELECT * FROM credit_cards WHERE user_id=%s ORDER BY bank_name",
+    "SELECT * FROM loans WHERE user_id=%s ORDER BY bank_name",
+]
+_ACCOUNTS_SQL = "; ".join(_ACCOUNTS_STATEMENTS)
+
+_SAVE_SCORE_SQL = (
+    "INSERT INTO credit_score (user_id, score, risk_band, dti, emi_burden, savings_rate, inputs_month, computed_at) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP) "
+    "ON DUPLICATE KEY UPDATE score=VALUES(score), risk_band=VALUES(risk_band), dti=VALUES(dti), emi_burden=VALUES(emi_burden), "
+    "savings_rate=VALUES(savings_rate), inputs_month=VALUES(inputs_month), computed_at=VALUES(computed_at)"
+)
+
+
+def _drain(cur):
+    # Reads any remaining result sets so the connection is ready for reuse.
+    while cur.nextset():
+        pass
+
+
+def fetch_dashboard(conn, user_id, month_start):
+    # Monthly totals come from monthly_rollup: a handful of category rows
+    # instead of every transaction of the month.
+    cur = conn.cursor()
+    cur.execute(_DASHBOARD_SQL, (month_start, month_start, user_id))
+    row = cur.fetchone()
+    cur.close()
+    return _dashboard_data(row)
+
+
+def fetch_dashboard_fan_out(user_id, month_start):
+    profile, income, expenses, emi = fan_out(zip(_DASHBOARD_FAN_OUT, [
+        (user_id,),
+        (user_id, month_start),
+        (user_id, month_start),
+        (user_id,),
+    ]))
+    return _dashboard_data({**profile[0], **income[0], **expenses[0], **emi[0]})
+
+
+def _dashboard_data(row):
+    # A missing user row still yields the sums, with an empty profile
+    return DashboardData(
+        age=row["age"],
+        monthly_income=float(row["monthly_income"] or 0.0),
+        employment_type=row["employment_type"] or "",
+        total_income=float(row["total_income"] or 0.0),
+        total_expenses=float(row["total_expenses"] or 0.0),
+        total_emi=float(row["total_emi"] or 0.0),
+        score=row["score"],
+        band=row["risk_band"],
+        dti=float(row["dti"] or 0.0),
+        emi_burden=float(row["emi_burden"] or 0.0),
+        savings_rate=float(row["savings_rate"] or 0.0),
+        score_month=row["inputs_month"],
+    )
+
+
+def fetch_accounts(conn, user_id):
+    cur = conn.cursor()
+    cur.execute(_ACCOUNTS_SQL, (user_id, user_id, user_id))
+    banks = cur.fetchall()
+    cur.nextset()
+    cards = cur.fetchall()
+    cur.nextset()
+    loans = cur.fetchall()
+    _drain(cur)
+    cur.close()
+    return _accounts_data(banks, cards, loans)
+
+
+def fetch_accounts_fan_out(user_id):
+    banks, cards, loans = fan_out([(sql, (user_id,)) for sql in _ACCOUNTS_STATEMENTS])
+    return _accounts_data(list(banks), list(cards), list(loans))
+
+
+def _accounts_data(banks, cards, loans):
+    total_liquidity = sum(float(b['balance']) for b in banks)
+    total_debt = sum(float(c['outstanding_amount']) for c in cards) + sum(float(l['principal'] or 0) for l in loans)
+    return AccountsData(banks, cards, loans, total_liquidity, total_debt)
+
+
+def save_credit_score(conn, user_id, score, band, dti, emi_burden, savings_rate, inputs_month):
+    # Also commits any writes already pending on conn.
+    cur = conn.cursor()
+    cur.execute(_SAVE_SCORE_SQL, (user_id, int(score), band, dti, emi_burden, savings_rate, inputs_month))
+    cur.close()
+    conn.commit()
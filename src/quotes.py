@@ -0,0 +1,83 @@
+import argparse
+import datetime
+
+import pymysql
+from dotenv import load_dotenv
+
+from src.db import get_conn
+from src.records import MAX_MONEY, iter_records, positive_decimal
+
+
+# Shared market prices. market_quotes holds one row per ticker; holdings are
+# valued by joining it on stocks.ticker, so a price change is one row write no
+# matter how many users hold the ticker. stocks.current_price stays as the
+# fallback for tickers without a quote.
+
+QUOTE_BATCH_ROWS = 1000
+
+_UPSERT_SQL = (
+    "INSERT INTO market_quotes (ticker, price, quoted_at) VALUES (%s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE price=VALUES(price), quoted_at=VALUES(quoted_at)"
+)
+_MAX_TICKER = 20
+
+
+class QuoteError(ValueError):
+    pass
+
+
+def _parse_quote(record, where):
+    ticker = str(record.get("ticker") or "").strip().upper()
+    if not ticker or len(ticker) > _MAX_TICKER:
+        raise QuoteError(f"{where}: ticker must be 1-{_MAX_TICKER} characters.")
+    try:
+        price = positive_decimal(record.get("price"), "price", maximum=MAX_MONEY)
+    except ValueError as e:
+        raise QuoteError(f"{where}: {e}")
+    return ticker, price
+
+
+def _json_quotes(quotes):
+    if not isinstance(quotes, dict):
+        raise QuoteError("JSON quotes must be an object mapping ticker to price.")
+    for ticker, price in quotes.items():
+        yield {"ticker": ticker, "price": price}, f"Ticker {ticker!r}"
+
+
+def iter_quotes(stream, filename):
+    # Yields validated (ticker, price) pairs from a CSV file with ticker and
+    # price columns, or a JSON object mapping ticker to price.
+    for record, where in iter_records(stream, filename, QuoteError, _json_quotes):
+        yield _parse_quote(record, where)
+
+
+def upsert_quotes(conn, quotes, batch_rows=QUOTE_BATCH_ROWS):
+    # Validates the whole feed before writing it in one transaction. Returns
+    # the tickers that were written; a ticker listed twice keeps its last price.
+    latest = dict(quotes)
+    quoted_at = datetime.datetime.now().replace(microsecond=0)
+    rows = [(ticker, price, quoted_at) for ticker, price in latest.items()]
+    cur = conn.cursor()
+    try:
+        for i in range(0, len(rows), batch_rows):
+            cur.executemany(_UPSERT_SQL, rows[i:i + batch_rows])
+        conn.commit()
+    except pymysql.Error as e:
+        conn.rollback()
+        raise e
+    finally:
+        cur.close()
+    return list(latest)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Load a ticker -> price feed into market_quotes.")
+    parser.add_argument("path", help="CSV (ticker,price) or JSON ({ticker: price}) file")
+    args = parser.parse_args()
+
+    conn = get_conn("credit_engine")
+    with open(args.path, "rb") as f:
+        tickers = upsert_quotes(conn, iter_quotes(f, args.path))
+    conn.close()
+    print(f"Quotes: updated {len(tickers)} tickers.")
@@ -0,0 +1,54 @@
+import codecs
+import csv
+import json
+import os
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+
+# Reading uploaded record files and validating the money and quantity values
+# in them, shared by statement imports (src/importer.py), the price feed
+# (src/quotes.py) and trades (src/portfolio.py). Limits match the DECIMAL
+# columns the values are stored in.
+
+CENTS = Decimal("0.01")
+QUANTITY_STEP = Decimal("0.0001")
+MAX_MONEY = Decimal("9999999999999.99")  # DECIMAL(15,2)
+MAX_QUANTITY = Decimal("99999999999.9999")  # DECIMAL(15,4)
+
+
+def positive_decimal(value, name, step=CENTS, maximum=MAX_MONEY):
+    # Parses value ("1,234.5", 12, Decimal) and rounds it to step as MySQL
+    # rounds on insert. Raises ValueError unless step <= result <= maximum.
+    try:
+        number = Decimal(str("" if value is None else value).strip().replace(",", ""))
+    except InvalidOperation:
+        raise ValueError(f"{name} is not a number.")
+    if number.is_finite() and number <= maximum:
+        number = number.quantize(step, rounding=ROUND_HALF_UP)
+    if not number.is_finite() or number <= 0 or number > maximum:
+        raise ValueError(f"{name} must be between {step} and {maximum}.")
+    return number
+
+
+def iter_records(stream, filename, error, json_records):
+    # Yields (record, where) pairs from a CSV file with a header row (keys
+    # stripped and lowercased, where = "Line N") or from a JSON document,
+    # which json_records turns into such pairs. Decoding problems and other
+    # file types raise error.
+    ext = os.path.splitext(filename or "")[1].lower()
+    text = codecs.getreader("utf-8-sig")(stream)
+    if ext == ".json":
+        try:
+            document = json.load(text)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise error(f"Invalid JSON: {e}")
+        yield from json_records(document)
+    elif ext == ".csv":
+        reader = csv.DictReader(text)
+        try:
+            for record in reader:
+                yield {k.strip().lower(): v for k, v in record.items() if k}, f"Line {reader.line_num}"
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise error(f"Invalid CSV: {e}")
+    else:
+        raise error("File must be a .csv or .json file.")
@@ -0,0 +1,120 @@
+import argparse
+
+from dotenv import load_dotenv
+
+from src.db import get_conn
+
+
+# monthly_rollup holds per-user, per-month, per-category totals of the income
+# and expenses tables. add_to_rollup keeps it current inside the same
+# transaction as each raw insert; rebuild_rollups / verify_rollups recompute it
+# from the raw rows to repair or detect drift.
+
+KINDS = {"income": "income", "expense": "expenses"}
+
+_UPSERT_SQL = (
+    "INSERT INTO monthly_rollup (user_id, month, kind, category, total, tx_count) "
+    "VALUES (%s, %s, %s, %s, %s, %s) "
+    "ON DUPLICATE KEY UPDATE total=total+VALUES(total), tx_count=tx_count+VALUES(tx_count)"
+)
+
+# Raw rows grouped the way monthly_rollup stores them. Contains %% so it must be
+# run with an args tuple.
+_RAW_SQL = " UNION ALL ".join(
+    f"SELECT user_id, CAST(DATE_FORMAT(tx_date, '%%Y-%%m-01') AS DATE) AS month, '{kind}' AS kind, "
+    f"COALESCE(category, '') AS category, SUM(amount) AS total, COUNT(*) AS tx_count "
+    f"FROM {table} WHERE tx_date IS NOT NULL {{user_filter}} GROUP BY user_id, month, COALESCE(category, '')"
+    for kind, table in KINDS.items()
+)
+
+_KEY = "user_id, month, kind, category"
+
+
+def month_of(tx_date):
+    return tx_date.replace(day=1)
+
+
+def add_to_rollup(cur, user_id, kind, category, tx_date, amount, count=1):
+    # Call on the cursor that inserted the raw row, before committing.
+    cur.execute(_UPSERT_SQL, (user_id, month_of(tx_date), kind, category or "", amount, count))
+
+
+def add_many_to_rollup(cur, user_id, totals):
+    # totals maps (kind, month, category) to (amount, count), e.g. the
+    # aggregate of a bulk insert; one row per key instead of one per insert.
+    rows = [
+        (user_id, month, kind, category or "", amount, count)
+        for (kind, month, category), (amount, count) in totals.items()
+    ]
+    if rows:
+        cur.executemany(_UPSERT_SQL, rows)
+
+
+def _raw_sql(user_id):
+    return _RAW_SQL.format(user_filter="AND user_id=%s" if user_id is not None else "")
+
+
+def _raw_args(user_id):
+    return (user_id,) * len(KINDS) if user_id is not None else ()
+
+
+def rebuild_rollups(conn, user_id=None):
+    # Replaces the rollup rows (of one user, or everyone) with totals
+    # recomputed from the raw tables, in one transaction.
+    cur = conn.cursor()
+    if user_id is None:
+        cur.execute("DELETE FROM monthly_rollup")
+    else:
+        cur.execute("DELETE FROM monthly_rollup WHERE user_id=%s", (user_id,))
+    cur.execute(
+        f"INSERT INTO monthly_rollup ({_KEY}, total, tx_count) SELECT {_KEY}, total, tx_count FROM ({_raw_sql(user_id)}) raw",
+        _raw_args(user_id),
+    )
+    rows = cur.rowcount
+    conn.commit()
+    cur.close()
+    return rows
+
+
+def verify_rollups(conn, user_id=None):
+    # Returns the rollup keys whose stored totals differ from the raw rows,
+    # including keys missing on either side.
+    raw_sql = _raw_sql(user_id)
+    rollup_filter = "AND r.user_id=%s" if user_id is not None else ""
+    sql = (
+        f"SELECT r.user_id, r.month, r.kind, r.category, r.total AS rollup_total, r.tx_count AS rollup_count, "
+        f"raw.total AS raw_total, raw.tx_count AS raw_count "
+        f"FROM monthly_rollup r LEFT JOIN ({raw_sql}) raw USING ({_KEY}) "
+        f"WHERE (raw.user_id IS NULL OR raw.total <> r.total OR raw.tx_count <> r.tx_count) {rollup_filter} "
+        f"UNION ALL "
+        f"SELECT raw.user_id, raw.month, raw.kind, raw.category, NULL, NULL, raw.total, raw.tx_count "
+        f"FROM ({raw_sql}) raw LEFT JOIN monthly_rollup r USING ({_KEY}) WHERE r.user_id IS NULL"
+    )
+    args = _raw_args(user_id) + ((user_id,) if user_id is not None else ()) + _raw_args(user_id)
+    cur = conn.cursor()
+    cur.execute(sql, args)
+    mismatches = cur.fetchall()
+    cur.close()
+    return list(mismatches)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Rebuild or verify the monthly income/expense rollups.")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    conn = get_conn("credit_engine")
+    if args.command == "rebuild":
+        count = rebuild_rollups(conn, args.user_id)
+        print(f"Rollup: rebuilt {count} rows.")
+    else:
+        mismatches = verify_rollups(conn, args.user_id)
+        for m in mismatches:
+            print(
+                f"Rollup drift: user {m['user_id']} {m['month']} {m['kind']} {m['category']!r}: "
+                f"rollup={m['rollup_total']}/{m['rollup_count']} raw={m['raw_total']}/{m['raw_count']}"
+            )
+        print(f"Rollup: {len(mismatches)} mismatched rows.")
+    conn.close()
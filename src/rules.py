@@ -0,0 +1,114 @@
+import bisect
+import json
+import os
+import threading
+
+import numpy as np
+
+
+# Scoring rules as data. src/scoring_rules.json (or the file named by
+# SCORING_RULES) defines, per score, a base, point tables per factor and the
+# band table. A range table is an ascending list of entries, each with an upper
+# bound ("lt": value < bound, "le": value <= bound) and the last without one;
+# a value takes the first entry it fits. A categorical table maps lowercase
+# strings to points with a default.
+#
+# Tables are compiled once, on first use, into sorted edges where every bound is exclusive
+# ("le" bounds move to the next float up), so a lookup is bisect_right for one
+# value or np.searchsorted for an array, and both give the same bin. NaN fits
+# no bound and takes the last entry.
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scoring_rules.json")
+
+
+class RangeTable:
+    def __init__(self, entries, field):
+        edges = []
+        for entry in entries[:-1]:
+            if "lt" in entry:
+                edges.append(float(entry["lt"]))
+            elif "le" in entry:
+                edges.append(float(np.nextafter(float(entry["le"]), np.inf)))
+            else:
+                raise ValueError(f"Only the last entry of a range table may omit its bound: {entry}")
+        if any(b <= a for a, b in zip(edges, edges[1:])):
+            raise ValueError(f"Range table bounds must be ascending: {entries}")
+        self.edges = edges
+        self.values = [entry[field] for entry in entries]
+        self._edges = np.array(edges, dtype=np.float64)
+        self._values = np.array(self.values)
+
+    def lookup(self, value):
+        return self.values[bisect.bisect_right(self.edges, float(value))]
+
+    def lookup_array(self, values):
+        return self._values[np.searchsorted(self._edges, np.asarray(values, dtype=np.float64), side="right")]
+
+
+class CategoryTable:
+    def __init__(self, table):
+        self.points = {str(k).lower(): v for k, v in table["match"].items()}
+        self.default = table.get("default", 0)
+
+    def lookup(self, value):
+        return self.points.get((value or "").lower(), self.default)
+
+    def lookup_array(self, values):
+        return np.array([self.lookup(v) for v in values], dtype=np.int64)
+
+
+class ScoreRules:
+    def __init__(self, spec):
+        self.base = spec["base"]
+        self.min = spec.get("min")
+        self.max = spec.get("max")
+        self.no_income_score = spec.get("no_income_score")
+        self.factors = {
+            name: CategoryTable(table) if isinstance(table, dict) else RangeTable(table, "points")
+            for name, table in spec["factors"].items()
+        }
+        self.bands = RangeTable(spec["bands"], "band")
+
+    def points(self, factor, value):
+        return self.factors[factor].lookup(value)
+
+    def points_array(self, factor, values):
+        return self.factors[factor].lookup_array(values)
+
+    def clamp(self, score):
+        if self.min is not None:
+            score = max(self.min, score)
+        if self.max is not None:
+            score = min(self.max, score)
+        return score
+
+    def clamp_array(self, scores):
+        return np.clip(scores, self.min, self.max) if self.min is not None or self.max is not None else scores
+
+    def band(self, score):
+        return self.bands.lookup(score)
+
+    def band_array(self, scores):
+        return self.bands.lookup_array(scores)
+
+
+def load_rules(path=None):
+    path = path or os.environ.get("SCORING_RULES") or DEFAULT_RULES_PATH
+    with open(path) as f:
+        spec = json.load(f)
+    return {name: ScoreRules(rules) for name, rules in spec.items()}
+
+
+_rules = None
+_rules_lock = threading.Lock()
+
+
+def get_rules(name):
+    # The rules file is read on first use rather than at import, so entry
+    # points have run load_dotenv() by then and SCORING_RULES from .env applies.
+    global _rules
+    if _rules is None:
+        with _rules_lock:
+            if _rules is None:
+                _rules = load_rules()
+    return _rules[name]
@@ -0,0 +1,82 @@
+import math
+
+from src import credit, risk
+
+
+# Synchronous scoring of caller-supplied records with the vectorized scorers,
+# without MySQL. Each model lists the record fields it reads; missing or null
+# fields count as 0 (or empty), as they do for rows read from the database.
+# Every model returns the same result columns for any batch size, empty too.
+
+MODELS = {
+    "risk": ("amt_income_total", "cnt_children", "days_birth", "days_employed"),
+    "credit": ("monthly_income", "total_expenses", "total_emi", "age", "employment_type"),
+}
+
+
+class ScoreRequestError(ValueError):
+    pass
+
+
+# Numeric fields must be finite and fit the scorers' int64 columns
+_MAX_MAGNITUDE = 2 ** 63 - 1
+
+
+def _checked(convert, value):
+    value = convert(value or 0)
+    if not math.isfinite(value) or abs(value) > _MAX_MAGNITUDE:
+        raise ValueError(value)
+    return value
+
+
+def _column(records, name, convert=None):
+    try:
+        if convert is None:
+            return [r.get(name) for r in records]
+        return [_checked(convert, r.get(name)) for r in records]
+    except AttributeError:
+        raise ScoreRequestError("Each record must be a JSON object.")
+    except (TypeError, ValueError, OverflowError):
+        raise ScoreRequestError(f"{name} must be a finite number within the int64 range in every record.")
+
+
+def score_records(model, records):
+    # Returns a dict of result columns, each in the order of records.
+    if not isinstance(model, str) or model not in MODELS:
+        raise ScoreRequestError(f"Unknown model {model!r}; expected one of {sorted(MODELS)}.")
+    if not isinstance(records, list):
+        raise ScoreRequestError("records must be a list.")
+
+    if model == "risk":
+        # Same conversions as risk._risk_score_row
+        columns = (
+            _column(records, "amt_income_total", float),
+            _column(records, "cnt_children", int),
+            _column(records, "days_birth", int),
+            _column(records, "days_employed", int),
+        )
+        try:
+            scores, bands, ages = risk.score_batch(*columns)
+        except OverflowError:
+            raise ScoreRequestError("Numeric fields are out of range.")
+        return {"scores": scores.tolist(), "bands": bands.tolist(), "ages": ages.tolist()}
+
+    # Same conversions as credit.compute_score
+    columns = (
+        _column(records, "monthly_income", float),
+        _column(records, "total_expenses", float),
+        _column(records, "total_emi", float),
+        _column(records, "age", int),
+        _column(records, "employment_type"),
+    )
+    try:
+        scores, bands, dti, _, savings_rate, savings = credit.score_users(*columns)
+    except (AttributeError, TypeError, ValueError, OverflowError):
+        raise ScoreRequestError("Numeric fields must be numbers and employment_type a string.")
+    return {
+        "scores": scores.tolist(),
+        "bands": bands.tolist(),
+        "dti": dti.tolist(),
+        "savings_rate": savings_rate.tolist(),
+        "savings": savings.tolist(),
+    }
@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+
+from src import cache
+from src.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", fake)
+    return fake
+
+
+def test_load_racing_invalidate_is_not_cached():
+    c = TTLCache()
+
+    def load():
+        # A mutation commits and invalidates while this load is running
+        c.invalidate("k")
+        return "stale"
+
+    assert c.get_or_load("k", load) == "stale"
+    assert c.get("k") is None
+    assert c.stats()["stale_loads"] == 1
+    assert c.get_or_load("k", lambda: "fresh") == "fresh"
+    assert c.get("k") == "fresh"
+
+
+def test_load_racing_invalidate_where_is_not_cached():
+    c = TTLCache()
+
+    def load():
+        c.invalidate_where(lambda key: key[0] == "stocks")
+        return "stale"
+
+    assert c.get_or_load(("stocks", 1), load) == "stale"
+    assert c.get(("stocks", 1)) is None
+
+
+def test_invalidating_another_key_keeps_the_load():
+    c = TTLCache()
+
+    def load():
+        c.invalidate("other")
+        c.invalidate_where(lambda key: key == "other")
+        return "value"
+
+    c.get_or_load("k", load)
+    assert c.get("k") == "value"
+
+
+def test_racing_threads():
+    c = TTLCache()
+    loading = threading.Event()
+    invalidated = threading.Event()
+    results = []
+
+    def load():
+        loading.set()
+        invalidated.wait(5)
+        return "stale"
+
+    worker = threading.Thread(target=lambda: results.append(c.get_or_load("k", load)))
+    worker.start()
+    assert loading.wait(5)
+    c.invalidate("k")
+    invalidated.set()
+    worker.join(5)
+    assert results == ["stale"]
+    assert c.get("k") is None
+    # Bookkeeping for in-flight loads is released afterwards
+    assert not c._loading and not c._generations
+
+
+def test_failed_load_releases_bookkeeping():
+    c = TTLCache()
+
+    def load():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        c.get_or_load("k", load)
+    assert not c._loading and not c._generations
+    assert c.set("k", 1) is True
+
+
+def test_ttl_expiry(clock):
+    c = TTLCache(ttl_s=10)
+    c.set("k", "v")
+    clock.now += 9.9
+    assert c.get("k") == "v"
+    clock.now += 0.2
+    assert c.get("k") is None
+    assert c.stats()["expirations"] == 1
+    assert c.get_or_load("k", lambda: "reloaded") == "reloaded"
+
+
+def test_lru_eviction():
+    c = TTLCache(maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # "b" is now least recently used
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.stats()["evictions"] == 1
+    assert c.stats()["size"] == 2
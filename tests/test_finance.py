@@ -0,0 +1,46 @@
+import random
+
+from src.finance import finance_batch
+
+
+# The row-by-row computation finance_batch replaced, kept as the reference.
+
+def _scalar_finance(amt_income, days_birth, children):
+    income = float(amt_income or 0.0)
+    age = max(0, int(-int(days_birth or 0) // 365))
+    dependents = int(children or 0)
+    return income, round(income * 0.5, 2), round(income * 0.3, 2), round(income * 0.2, 2), age, dependents
+
+
+def _assert_parity(cases):
+    columns = finance_batch(*zip(*cases))
+    for i, case in enumerate(cases):
+        # Exact equality: the written values must be the same floats
+        assert tuple(c[i] for c in columns) == _scalar_finance(*case), case
+
+
+def test_ties_at_third_decimal():
+    # Incomes whose 50/30/20 shares end in ...5 at the third decimal
+    incomes = [0.01, 0.05, 0.25, 1.005, 2.675, 10.01, 12345.67, 0.1, 0.3, 0.7, 1.15, 2.5, 33.35]
+    incomes += [i / 100 for i in range(1, 2000)]
+    _assert_parity([(income, -10000, 1) for income in incomes])
+
+
+def test_negative_values():
+    incomes = [-0.01, -0.05, -1.005, -2.675, -12345.67, -0.25]
+    _assert_parity([(income, days_birth, 0) for income in incomes for days_birth in (0, 1, 364, 365, 366)])
+
+
+def test_large_values():
+    incomes = [1e9 + 0.05, 123456789.15, 9.99e12, 2.0 ** 52, 1e15 + 0.25, 987654321.005]
+    _assert_parity([(income, -20000, 3) for income in incomes])
+
+
+def test_random_cents():
+    rng = random.Random(7)
+    _assert_parity([(round(rng.uniform(-1e7, 1e7), 2), -rng.randint(0, 40000), rng.randint(0, 5)) for _ in range(20000)])
+
+
+def test_ages_floor_and_clamp():
+    cases = [(1000, days_birth, 0) for days_birth in (0, 1, 365, -1, -364, -365, -366, -365 * 60, -365 * 60 - 1)]
+    _assert_parity(cases)
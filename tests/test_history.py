@@ -0,0 +1,99 @@
+import base64
+import datetime
+from decimal import Decimal
+
+import pytest
+
+from src.history import HistoryError, MAX_PAGE_SIZE, decode_cursor, encode_cursor, fetch_page
+
+
+@pytest.mark.parametrize("date, row_id", [
+    (datetime.date(2024, 5, 31), 1),
+    (datetime.date(1999, 1, 1), 2 ** 62),
+    (None, 42),
+])
+def test_cursor_round_trip(date, row_id):
+    cursor = encode_cursor(date, row_id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (date, row_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(b"[1, 2, 3]").decode(),
+    base64.urlsafe_b64encode(b'"2024-01-01"').decode(),
+    base64.urlsafe_b64encode(b'["2024-13-01", 1]').decode(),
+    base64.urlsafe_b64encode(b'["2024-01-01", "x"]').decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+])
+def test_bad_cursors_raise_history_error(cursor):
+    with pytest.raises(HistoryError):
+        decode_cursor(cursor)
+
+
+class FakeConn:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, args):
+        self.executed.append((sql, args))
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+def _rows(n):
+    day = datetime.date(2024, 5, 31)
+    return [{"id": 100 - i, "amount": Decimal("1.50"), "category": "Food", "tx_date": day} for i in range(n)]
+
+
+def test_full_page_returns_cursor_of_last_row():
+    conn = FakeConn(_rows(3))
+    items, next_cursor = fetch_page(conn, "expenses", 7, limit=2)
+    assert [item["id"] for item in items] == [100, 99]
+    assert items[0] == {"id": 100, "amount": 1.5, "category": "Food", "tx_date": "2024-05-31"}
+    assert decode_cursor(next_cursor) == (datetime.date(2024, 5, 31), 99)
+    sql, args = conn.executed[0]
+    assert "ORDER BY tx_date DESC, id DESC LIMIT %s" in sql
+    assert args == [7, 3]
+
+
+def test_last_page_has_no_cursor():
+    items, next_cursor = fetch_page(FakeConn(_rows(2)), "income", 7, limit=2)
+    assert len(items) == 2 and next_cursor is None
+
+
+def test_cursor_and_filters_become_bound_arguments():
+    conn = FakeConn([])
+    cursor = encode_cursor(datetime.date(2024, 5, 1), 55)
+    fetch_page(conn, "loans", 7, cursor=cursor, limit=10, date_from=datetime.date(2024, 1, 1), match="HDFC")
+    sql, args = conn.executed[0]
+    assert "bank_name=%s" in sql and "start_date >= %s" in sql
+    assert "(start_date < %s OR (start_date = %s AND id < %s) OR start_date IS NULL)" in sql
+    assert args == [7, "HDFC", datetime.date(2024, 1, 1), datetime.date(2024, 5, 1), datetime.date(2024, 5, 1), 55, 11]
+
+
+def test_cursor_past_dated_rows_continues_within_nulls():
+    conn = FakeConn([])
+    fetch_page(conn, "stock_transactions", 7, cursor=encode_cursor(None, 9))
+    sql, args = conn.executed[0]
+    assert "tx_date IS NULL AND id < %s" in sql
+    assert args[1] == 9
+
+
+def test_limit_is_clamped_and_ledger_checked():
+    conn = FakeConn([])
+    fetch_page(conn, "income", 7, limit=10 ** 6)
+    assert conn.executed[0][1][-1] == MAX_PAGE_SIZE + 1
+    fetch_page(conn, "income", 7, limit=0)
+    assert conn.executed[1][1][-1] == 2
+    with pytest.raises(HistoryError):
+        fetch_page(conn, "users", 7)
@@ -0,0 +1,114 @@
+import datetime
+import io
+import json
+from decimal import Decimal
+
+import pytest
+
+from src.importer import StatementError, import_statement, iter_statement
+
+
+def _csv(text):
+    return list(iter_statement(io.BytesIO(text.encode("utf-8")), "statement.csv"))
+
+
+def _json(records):
+    return list(iter_statement(io.BytesIO(json.dumps(records).encode("utf-8")), "statement.json"))
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.calls = []
+
+    def executemany(self, sql, rows):
+        self.calls.append((sql, list(rows)))
+
+
+def test_csv_rows_are_normalized():
+    rows = _csv(
+        "\ufeffDate, Amount ,TYPE,category\n"
+        "2024-05-01,\"52,000\",Income,Salary\n"
+        "2024-05-03,1200.505,expense,\n"
+    )
+    assert rows == [
+        ("income", datetime.date(2024, 5, 1), Decimal("52000.00"), "Salary"),
+        ("expense", datetime.date(2024, 5, 3), Decimal("1200.51"), "Other"),
+    ]
+
+
+def test_json_rows():
+    rows = _json([{"date": "2024-06-30", "amount": 10, "type": "expense", "category": "Food"}])
+    assert rows == [("expense", datetime.date(2024, 6, 30), Decimal("10.00"), "Food")]
+
+
+@pytest.mark.parametrize("field, value, message", [
+    ("type", "transfer", "type must be"),
+    ("date", "01/05/2024", "date must be"),
+    ("date", "2024-02-30", "date must be"),
+    ("amount", "abc", "not a number"),
+    ("amount", "0", "between 0.01"),
+    ("amount", "0.004", "between 0.01"),
+    ("amount", "-5", "between 0.01"),
+    ("amount", "NaN", "between 0.01"),
+    ("amount", "Infinity", "between 0.01"),
+    ("amount", "10000000000000", "between 0.01"),
+    ("category", "x" * 65, "longer than 64"),
+])
+def test_invalid_fields_name_the_row(field, value, message):
+    record = {"date": "2024-05-01", "amount": "10", "type": "income", "category": "Salary", field: value}
+    with pytest.raises(StatementError, match=f"Row 1: .*{message}"):
+        _json([record])
+
+
+def test_csv_errors_name_the_line():
+    with pytest.raises(StatementError, match="Line 3"):
+        _csv("date,amount,type\n2024-05-01,10,income\n2024-05-02,oops,income\n")
+
+
+@pytest.mark.parametrize("filename, body, message", [
+    ("s.json", b"{not json", "Invalid JSON"),
+    ("s.json", b'{"date": "2024-05-01"}', "must be an array"),
+    ("s.json", b"[1]", "expected an object"),
+    ("s.csv", b"date,amount,type\n\xff\xfe,1,income\n", "Invalid CSV"),
+    ("s.txt", b"", "must be a .csv or .json"),
+])
+def test_malformed_files(filename, body, message):
+    with pytest.raises(StatementError, match=message):
+        list(iter_statement(io.BytesIO(body), filename))
+
+
+def test_import_batches_rows_and_aggregates_rollups():
+    d1, d2 = datetime.date(2024, 5, 1), datetime.date(2024, 6, 2)
+    rows = [
+        ("income", d1, Decimal("100.00"), "Salary"),
+        ("expense", d1, Decimal("1.50"), "Food"),
+        ("income", d1, Decimal("50.00"), "Salary"),
+        ("expense", d2, Decimal("2.25"), "Food"),
+        ("income", d2, Decimal("5.00"), "Salary"),
+    ]
+    cur = RecordingCursor()
+    counts = import_statement(cur, 7, iter(rows), batch_rows=2)
+    assert counts == {"income": 3, "expense": 2}
+
+    inserts = [(sql, batch) for sql, batch in cur.calls if "monthly_rollup" not in sql]
+    income_batches = [batch for sql, batch in inserts if "INTO income " in sql]
+    expense_batches = [batch for sql, batch in inserts if "INTO expenses " in sql]
+    assert [len(b) for b in income_batches] == [2, 1]
+    assert [len(b) for b in expense_batches] == [2]
+    assert income_batches[0][0] == (7, Decimal("100.00"), "Salary", d1)
+
+    (rollup_sql, rollup_rows), = [(sql, batch) for sql, batch in cur.calls if "monthly_rollup" in sql]
+    assert sorted(rollup_rows) == sorted([
+        (7, datetime.date(2024, 5, 1), "income", "Salary", Decimal("150.00"), 2),
+        (7, datetime.date(2024, 5, 1), "expense", "Food", Decimal("1.50"), 1),
+        (7, datetime.date(2024, 6, 1), "expense", "Food", Decimal("2.25"), 1),
+        (7, datetime.date(2024, 6, 1), "income", "Salary", Decimal("5.00"), 1),
+    ])
+
+
+def test_invalid_row_stops_before_later_writes():
+    cur = RecordingCursor()
+    rows = iter_statement(io.BytesIO(b"date,amount,type\n2024-05-01,10,income\n2024-05-02,-1,income\n"), "s.csv")
+    with pytest.raises(StatementError):
+        import_statement(cur, 7, rows)
+    assert not any("monthly_rollup" in sql for sql, _ in cur.calls)
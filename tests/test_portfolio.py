@@ -0,0 +1,99 @@
+from decimal import Decimal as D
+
+import pytest
+
+from src.portfolio import apply_trade, record_buy, record_sell
+
+
+ZERO = (D("0"), D("0"), D("0"))
+
+
+def test_buys_average_cost():
+    position = apply_trade(ZERO, "BUY", D("10"), D("100.00"))
+    assert position == (D("10"), D("100.00"), D("0"))
+    position = apply_trade(position, "BUY", D("5"), D("130.00"))
+    assert position == (D("15"), D("110.00"), D("0"))
+
+
+def test_average_cost_rounds_half_up_to_cents():
+    # (1 * 10.00 + 2 * 10.01) / 3 = 10.00666...
+    assert apply_trade((D("1"), D("10.00"), D("0")), "BUY", D("2"), D("10.01"))[1] == D("10.01")
+    # (1 * 0.01 + 1 * 0.02) / 2 = 0.015
+    assert apply_trade((D("1"), D("0.01"), D("0")), "BUY", D("1"), D("0.02"))[1] == D("0.02")
+
+
+def test_sell_realizes_pnl_and_keeps_average_cost():
+    position = (D("15"), D("110.00"), D("0"))
+    position = apply_trade(position, "SELL", D("5"), D("120.00"))
+    assert position == (D("10"), D("110.00"), D("50.00"))
+    position = apply_trade(position, "SELL", D("10"), D("100.00"))
+    assert position == (D("0"), D("110.00"), D("-50.00"))
+
+
+def test_fractional_quantities():
+    position = apply_trade(ZERO, "BUY", D("0.3333"), D("99.99"))
+    position = apply_trade(position, "SELL", D("0.1111"), D("100.01"))
+    assert position == (D("0.2222"), D("99.99"), D("0.00"))
+
+
+class FakeCursor:
+    # Just enough of a cursor for record_buy / record_sell: one stocks table
+    # keyed by (user_id, ticker), honouring the unique key on insert.
+    def __init__(self, positions=None):
+        self.rows = dict(positions or {})
+        self.trades = []
+        self._result = None
+
+    def execute(self, sql, args):
+        if sql.startswith("INSERT INTO stock_transactions"):
+            self.trades.append(args)
+        elif sql.startswith("SELECT id, quantity"):
+            row = self.rows.get(args)
+            self._result = dict(row, id=args) if row else None
+        elif sql.startswith("INSERT INTO stocks"):
+            user_id, ticker, price = args
+            self.rows.setdefault((user_id, ticker), {
+                "quantity": D("0"), "avg_buy_price": D("0"), "realized_pnl": D("0.00"), "current_price": price,
+            })
+        elif sql.startswith("UPDATE stocks SET quantity=%s, avg_buy_price"):
+            quantity, avg_price, price, key = args
+            self.rows[key].update(quantity=quantity, avg_buy_price=avg_price, current_price=price)
+        elif sql.startswith("UPDATE stocks SET quantity=%s, current_price"):
+            quantity, price, realized, key = args
+            self.rows[key].update(quantity=quantity, current_price=price, realized_pnl=realized)
+        else:
+            raise AssertionError(sql)
+
+    def fetchone(self):
+        return self._result
+
+
+def test_first_buy_opens_one_position():
+    cur = FakeCursor()
+    record_buy(cur, 1, "INFY", "2", "100.005", None)
+    record_buy(cur, 1, "INFY", "2", "200", None)
+    assert list(cur.rows) == [(1, "INFY")]
+    assert cur.rows[(1, "INFY")]["quantity"] == D("4.0000")
+    assert cur.rows[(1, "INFY")]["avg_buy_price"] == D("150.01")
+    assert len(cur.trades) == 2
+
+
+def test_sell_more_than_held_writes_nothing():
+    cur = FakeCursor()
+    record_buy(cur, 1, "INFY", "1", "100", None)
+    assert record_sell(cur, 1, "INFY", "2", "100", None) is False
+    assert record_sell(cur, 1, "TCS", "1", "100", None) is False
+    assert len(cur.trades) == 1
+    assert record_sell(cur, 1, "INFY", "1", "90", None) is True
+    assert cur.rows[(1, "INFY")]["realized_pnl"] == D("-10.00")
+
+
+@pytest.mark.parametrize("qty, price", [
+    ("0", "10"), ("-1", "10"), ("abc", "10"), ("NaN", "10"), ("Infinity", "10"),
+    ("1", "0"), ("1", "0.004"), ("1", "1e20"), ("1e12", "10"),
+])
+def test_invalid_trades_are_rejected_before_writing(qty, price):
+    cur = FakeCursor()
+    with pytest.raises(ValueError):
+        record_buy(cur, 1, "INFY", qty, price, None)
+    assert not cur.trades and not cur.rows
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from app import app
+from src.score_api import ScoreRequestError, score_records
+
+
+TOKEN = "test-token"
+
+RESULT_KEYS = {
+    "risk": {"scores", "bands", "ages"},
+    "credit": {"scores", "bands", "dti", "savings_rate", "savings"},
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("SCORE_API_TOKEN", TOKEN)
+    return app.test_client()
+
+
+def _post(client, body, token=TOKEN):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    # allow_nan so NaN/Infinity reach the server as a lenient client would send them
+    data = json.dumps(body, allow_nan=True)
+    return client.post("/api/score", data=data, content_type="application/json", headers=headers)
+
+
+@pytest.mark.parametrize("record", [
+    {"cnt_children": 1e30},
+    {"days_birth": -1e30},
+    {"days_employed": 2 ** 63},
+    {"amt_income_total": float("nan")},
+    {"amt_income_total": float("inf")},
+])
+def test_risk_rejects_non_finite_and_out_of_range(client, record):
+    response = _post(client, {"model": "risk", "records": [record]})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+@pytest.mark.parametrize("record", [
+    {"age": float("inf")},
+    {"age": 1e30},
+    {"monthly_income": float("inf")},
+    {"monthly_income": float("nan")},
+    {"total_expenses": -float("inf")},
+    {"total_emi": 1e20},
+])
+def test_credit_rejects_non_finite_and_out_of_range(client, record):
+    response = _post(client, {"model": "credit", "records": [dict({"monthly_income": 50000}, **record)]})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_responses_are_strict_json(client):
+    response = _post(client, {"model": "credit", "records": [{"monthly_income": 9e18, "total_expenses": -9e18}]})
+    assert response.status_code == 200
+    json.loads(response.get_data(as_text=True), parse_constant=lambda c: pytest.fail(f"non-standard JSON {c}"))
+
+
+@pytest.mark.parametrize("model", sorted(RESULT_KEYS))
+@pytest.mark.parametrize("size", [0, 1, 3])
+def test_same_keys_for_every_batch_size(model, size):
+    results = score_records(model, [{} for _ in range(size)])
+    assert set(results) == RESULT_KEYS[model]
+    assert all(len(column) == size for column in results.values())
+
+
+def test_score_records_rejects_bad_input():
+    with pytest.raises(ScoreRequestError):
+        score_records("risk", [1])
+    with pytest.raises(ScoreRequestError):
+        score_records("unknown", [])
+    with pytest.raises(ScoreRequestError):
+        score_records("risk", {"records": []})
+
+
+def test_requires_token(client, monkeypatch):
+    body = {"model": "risk", "records": [{}]}
+    assert _post(client, body, token=None).status_code == 403
+    assert _post(client, body, token="wrong").status_code == 403
+    assert _post(client, body).status_code == 200
+    monkeypatch.delenv("SCORE_API_TOKEN")
+    assert _post(client, body).status_code == 403
+
+
+@pytest.mark.parametrize("model", [["risk"], {"name": "risk"}, 1, None])
+def test_non_string_model_is_rejected(client, model):
+    response = _post(client, {"model": model, "records": []})
+    assert response.status_code == 400
+    assert "Unknown model" in response.get_json()["error"]
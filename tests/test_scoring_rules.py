@@ -0,0 +1,128 @@
+import itertools
+import json
+
+import numpy as np
+import pytest
+
+from src import rules
+from src.credit import compute_score, score_users
+from src.risk import _risk_score_row, score_batch
+
+
+# The hard-coded rules the JSON tables replaced, kept as the reference.
+
+def _legacy_risk(amt_income, children, days_birth, days_employed):
+    age = max(0, int(-days_birth // 365))
+    score = 40
+    if amt_income < 120000:
+        score += 20
+    elif amt_income < 240000:
+        score += 10
+    if children >= 2:
+        score += 10
+    elif children == 1:
+        score += 5
+    if age < 25 or age > 60:
+        score += 10
+    if abs(days_employed) < 365:
+        score += 10
+    band = "low"
+    if score > 60:
+        band = "high"
+    elif score > 45:
+        band = "medium"
+    return score, band, age
+
+
+def _legacy_credit(income, expenses, emi, age, employment_type):
+    if income <= 0:
+        return 300, "high"
+    savings_rate = (income - expenses - emi) / income
+    dti = emi / income
+    score = 750
+    if dti < 0.2:
+        score += 50
+    elif dti < 0.4:
+        pass
+    elif dti < 0.6:
+        score -= 50
+    else:
+        score -= 100
+    if savings_rate > 0.2:
+        score += 25
+    elif savings_rate < 0.05:
+        score -= 25
+    score += 10 if 25 <= age <= 60 else -10
+    if (employment_type or "").lower() in {"working", "commercial associate", "manager", "office work"}:
+        score += 10
+    score = max(300, min(850, score))
+    band = "low" if score >= 750 else "medium" if score >= 650 else "high"
+    return score, band
+
+
+def _around(*values):
+    return sorted({v + d for v in values for d in (-1, 0, 1)})
+
+
+INCOMES = _around(0, 120000, 240000) + [119999.99, 120000.01, 239999.99, 240000.01]
+CHILDREN = [0, 1, 2, 3]
+# Birth offsets that land exactly on, just inside and just outside ages 25 and 60
+DAYS_BIRTH = [-365 * age + d for age in (24, 25, 26, 60, 61) for d in (-1, 0, 1)] + [0]
+DAYS_EMPLOYED = _around(-365, 365) + [0]
+
+
+def test_risk_scalar_batch_and_legacy_agree_on_boundaries():
+    cases = list(itertools.product(INCOMES, CHILDREN, DAYS_BIRTH, DAYS_EMPLOYED))
+    scores, bands, ages = score_batch(*zip(*cases))
+    for case, score, band, age in zip(cases, scores.tolist(), bands.tolist(), ages.tolist()):
+        row = dict(zip(("amt_income_total", "cnt_children", "days_birth", "days_employed"), case))
+        expected = _legacy_risk(*case)
+        assert _risk_score_row(row) == expected, case
+        assert (score, band, age) == expected, case
+
+
+# Monthly income 1000: expenses/EMI picked so savings rate and DTI sit on,
+# just below and just above 0.05 / 0.2 and 0.2 / 0.4 / 0.6.
+CREDIT_INCOMES = [0, -5, 1000]
+EXPENSES = [0, 750, 800, 950, 949.99, 950.01, 799.99, 800.01, 1200]
+EMIS = [0, 199.99, 200, 200.01, 400, 600, 599.99]
+AGES = [0, 24, 25, 26, 59, 60, 61]
+EMPLOYMENT = ["Working", "office work", "Pensioner", "", None]
+
+
+def test_credit_scalar_batch_and_legacy_agree_on_boundaries():
+    cases = list(itertools.product(CREDIT_INCOMES, EXPENSES, EMIS, AGES, EMPLOYMENT))
+    batch = score_users(*zip(*cases))
+    for i, case in enumerate(cases):
+        scalar = compute_score(*case)
+        assert scalar[:2] == _legacy_credit(*case), case
+        assert (batch[0][i], batch[1][i]) == scalar[:2], case
+        assert np.allclose([column[i] for column in batch[2:]], scalar[2:]), case
+
+
+def test_score_band_boundaries():
+    risk_rules = rules.get_rules("risk")
+    assert [risk_rules.band(s) for s in (45, 46, 60, 61)] == ["low", "medium", "medium", "high"]
+    credit_rules = rules.get_rules("credit")
+    assert [credit_rules.band(s) for s in (649, 650, 749, 750)] == ["high", "medium", "medium", "low"]
+
+
+def test_rules_load_lazily_from_env(monkeypatch, tmp_path):
+    with open(rules.DEFAULT_RULES_PATH) as f:
+        spec = json.load(f)
+    spec["risk"]["base"] = 0
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(spec))
+
+    # As if SCORING_RULES came from .env, loaded after src.rules was imported
+    monkeypatch.setenv("SCORING_RULES", str(path))
+    monkeypatch.setattr(rules, "_rules", None)
+    assert rules.get_rules("risk").base == 0
+    monkeypatch.setattr(rules, "_rules", None)
+    monkeypatch.delenv("SCORING_RULES")
+    assert rules.get_rules("risk").base == 40
+
+
+def test_range_table_rejects_unordered_bounds():
+    with pytest.raises(ValueError):
+        rules.RangeTable([{"lt": 2, "points": 0}, {"lt": 1, "points": 1}, {"points": 2}], "points")